@@ -1,38 +1,90 @@
 import asyncio
+import logging
+import time
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 username = os.getenv("UFILE_USERNAME", "your_username")
-print(f"Username: {username}")
 password = os.getenv("UFILE_PASSWORD", "your_password")
-playwright_port = os.getenv("PLAYWRIGHT_PORT", 9300)
+playwright_port = int(os.getenv("PLAYWRIGHT_PORT", 9300))
+
+WINDOW_WIDTH = int(os.getenv("WINDOW_WIDTH", 800))
+WINDOW_HEIGHT = int(os.getenv("WINDOW_HEIGHT", 600))
+
+LOGIN_URL = 'https://secure.ufile.ca/account/login?lang=en&mode=UFileT1'
+
+# Persisted cookies/localStorage of a logged-in uFile session. Reusing it
+# skips the login form (and its CAPTCHA risk) on restart; uFile sessions
+# expire, so the file only counts when younger than STATE_MAX_AGE_SECONDS.
+STATE_FILE = 'ufile_state.json'
+STATE_MAX_AGE_SECONDS = 12 * 3600
+
 
-WINDOW_WIDTH = os.getenv("WINDOW_WIDTH", 800)
-WINDOW_HEIGHT = os.getenv("WINDOW_HEIGHT", 600)
+def fresh_state_file():
+    try:
+        if time.time() - os.path.getmtime(STATE_FILE) < STATE_MAX_AGE_SECONDS:
+            return STATE_FILE
+    except OSError:
+        pass
+    return None
 
 
 async def main():
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=False,
-            args=[f'--remote-debugging-port={playwright_port}',
-                  f'--window-size={WINDOW_WIDTH},{WINDOW_HEIGHT}'],
-
-        )
-        print(
-            f"Playwright instance address: http://localhost:{playwright_port}")
-
-        # Create a page
-        page = await browser.new_page()
-        await page.goto('https://secure.ufile.ca/account/login?lang=en&mode=UFileT1')
+        endpoint = f"http://localhost:{playwright_port}"
+        browser = None
+        try:
+            # Reuse an already-running Chromium so restarts are instant and we
+            # don't stack up duplicate browser processes.
+            browser = await p.chromium.connect_over_cdp(endpoint)
+            logger.info(f"Connected to existing Playwright instance: {endpoint}")
+        except Exception:
+            browser = await p.chromium.launch(
+                headless=False,
+                args=[f'--remote-debugging-port={playwright_port}',
+                      f'--window-size={WINDOW_WIDTH},{WINDOW_HEIGHT}'],
+
+            )
+            logger.info(f"Playwright instance address: {endpoint}")
+
+        # Reuse the existing page when connected to a running instance
+        contexts = browser.contexts
+        if contexts and contexts[0].pages:
+            page = contexts[0].pages[0]
+        elif state_file := fresh_state_file():
+            context = await browser.new_context(storage_state=state_file)
+            page = await context.new_page()
+            logger.info(f"Restored uFile session from {state_file}")
+        else:
+            page = await browser.new_page()
+
+        if not page.url.startswith('https://secure.ufile.ca'):
+            await page.goto(LOGIN_URL)
         await page.set_viewport_size(
-            {'width': int(WINDOW_WIDTH), 'height': int(WINDOW_HEIGHT)})
-        await page.fill('input[name="Username"]', username)
-        await page.fill('input[name="Password"]', password)
+            {'width': WINDOW_WIDTH, 'height': WINDOW_HEIGHT})
+        # Only pre-fill credentials when we're actually on the login page;
+        # an established session doesn't need them again.
+        if page.url.startswith(LOGIN_URL.split('?')[0]):
+            await page.fill('input[name="Username"]', username)
+            await page.fill('input[name="Password"]', password)
+
+            # Login is submitted manually; once the URL leaves the login
+            # page, persist the session so the next start skips the form.
+            try:
+                await page.wait_for_url(
+                    lambda url: not url.startswith(LOGIN_URL.split('?')[0]),
+                    timeout=0)
+                await page.context.storage_state(path=STATE_FILE)
+                logger.info(f"Saved uFile session to {STATE_FILE}")
+            except Exception as e:
+                logger.warning(f"Could not persist session state: {e}")
 
         # Use a never-resolving future to keep the script running indefinitely
         # This is more reliable than using wait_for_timeout
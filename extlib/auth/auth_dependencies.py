@@ -1,22 +1,42 @@
+import logging
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .jwt_handler import verify_internal_token, credentials_exception
-from .auth_models import TokenPayload, UserResponse # Use UserResponse for return type hint
+from .auth_models import TokenPayloadFast, UserClaims, UserResponse # Use UserResponse for return type hint
 from .database import get_async_session, User # Import DB session and User model
 from .user_crud import get_user_by_id # Import CRUD function
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token") 
+logger = logging.getLogger(__name__)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-async def get_current_user_data(token: str = Depends(oauth2_scheme)) -> TokenPayload:
+async def get_current_user_data(token: str = Depends(oauth2_scheme)) -> TokenPayloadFast:
     """Dependency that verifies token and returns its payload."""
     return verify_internal_token(token)
 
+async def get_current_user_claims(
+    token_payload: TokenPayloadFast = Depends(get_current_user_data)
+) -> UserClaims:
+    """
+    Dependency that builds the user identity from JWT claims alone — no DB
+    round-trip. Use this on hot routes that only need id/email; fall back to
+    get_current_active_user when fresh DB state is required.
+    """
+    if token_payload.sub is None:
+         raise credentials_exception
+    return UserClaims(
+        id=token_payload.sub,
+        email=token_payload.email,
+        firebase_uid=token_payload.firebase_uid,
+    )
+
 async def get_current_active_user(
-    token_payload: TokenPayload = Depends(get_current_user_data),
+    token_payload: TokenPayloadFast = Depends(get_current_user_data),
     db: AsyncSession = Depends(get_async_session)
-) -> User: 
+) -> User:
     """
     Dependency that verifies token, gets payload, and retrieves the full user object from DB.
     Raises 401 if user not found or inactive (add active check if needed).
@@ -26,11 +46,11 @@ async def get_current_active_user(
 
     user = await get_user_by_id(db, user_id=token_payload.sub)
     if user is None:
-        print(f"Authenticated user ID {token_payload.sub} not found in database.")
+        logger.warning("Authenticated user ID %s not found in database.", token_payload.sub)
         raise credentials_exception
     return user
 
-async def get_current_user_id(token_payload: TokenPayload = Depends(get_current_user_data)) -> str:
+async def get_current_user_id(token_payload: TokenPayloadFast = Depends(get_current_user_data)) -> str:
     """Dependency that verifies token and returns only the user ID."""
     if token_payload.sub is None:
          raise credentials_exception
@@ -1,5 +1,7 @@
+import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, HttpUrl, ConfigDict
+from pydantic import BaseModel, EmailStr, HttpUrl, ConfigDict, field_validator
 from typing import Optional
 
 # --- Request Models ---
@@ -12,18 +14,26 @@ class UserBase(BaseModel):
     """Base Pydantic model for user fields."""
     email: EmailStr
     name: Optional[str] = None
-    picture: Optional[HttpUrl | str] = None # Allow string or HttpUrl
-    created_at: Optional[datetime] = None 
-    updated_at: Optional[datetime] = None 
-    model_config = ConfigDict(from_attributes=True)
+    # Plain str on the response path: the URL was already validated when the
+    # user was created, so re-parsing it per request is wasted work
+    picture: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True, validate_assignment=False)
 
 class UserCreate(UserBase):
     """Model used when creating a user (might include password if needed)."""
     firebase_uid: str
+    picture: Optional[HttpUrl | str] = None # Allow string or HttpUrl
 
 class UserResponse(UserBase):
     """User information sent back to the frontend."""
-    id: str # Include your internal ID
+    id: str # Include your internal ID (dashed-UUID form of the 16-byte DB key)
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def _encode_id(cls, v):
+        return str(uuid.UUID(bytes=v)) if isinstance(v, bytes) else v
 
 class UserInDB(UserBase):
      """User model as fully represented in DB (used internally)."""
@@ -34,6 +44,22 @@ class UserInDB(UserBase):
 class TokenPayload(BaseModel):
     """Expected structure of the data within the internal JWT."""
     sub: Optional[str] = None
+    email: Optional[str] = None
+    firebase_uid: Optional[str] = None
+
+@dataclass(slots=True)
+class TokenPayloadFast:
+    """Lightweight token payload used on the hot verify path (no Pydantic validation)."""
+    sub: Optional[str] = None
+    email: Optional[str] = None
+    firebase_uid: Optional[str] = None
+
+@dataclass(slots=True)
+class UserClaims:
+    """User identity rebuilt from JWT claims, avoiding a DB lookup per request."""
+    id: str
+    email: Optional[str] = None
+    firebase_uid: Optional[str] = None
 
 class InternalTokenData(BaseModel):
     """Data used to *create* the internal JWT payload."""
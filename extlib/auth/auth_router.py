@@ -1,6 +1,10 @@
 # extlib/auth_router.py
+import logging
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from .firebase_config import verify_firebase_token
 from .user_crud import get_or_create_db_user
@@ -15,6 +19,8 @@ from .auth_models import (
 from .database import get_async_session # Import the dependency function
 from sqlalchemy.ext.asyncio import AsyncSession
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.post("/google-login", response_model=AuthApiResponse, tags=["Authentication"])
@@ -25,16 +31,22 @@ async def google_login_endpoint(firebase_token_model: FirebaseToken = Body(...),
     and returns an internal JWT.
     """
     try:
-        # 1. Verify Firebase ID token
-        decoded_token = verify_firebase_token(firebase_token_model.token)
-        print(f"Decoded token: {decoded_token}")  # Log the decoded token for debugging
+        # 1. Verify Firebase ID token (RSA verify + possible key fetch, so
+        #    keep it off the event loop)
+        decoded_token = await run_in_threadpool(
+            verify_firebase_token, firebase_token_model.token)
+        logger.debug("Decoded token: %s", decoded_token)
         # 2. Get or create user in your database
         # Ensure the function returns a UserInDB compatible object
         app_user = await get_or_create_db_user(db,decoded_token)
 
         # 3. Prepare data for internal JWT payload
+        # The sub keeps the dashed-UUID form the session stores already key
+        # on; the 16-byte PK stays internal to the auth DB. Rows not yet
+        # through migrate_user_ids.py still hold the string directly.
         internal_token_payload = InternalTokenData(
-            sub=app_user.id, # Use your internal ID
+            sub=(app_user.id if isinstance(app_user.id, str)
+                 else str(uuid.UUID(bytes=app_user.id))),
             email=app_user.email,
             firebase_uid=app_user.firebase_uid
             # Add other claims if needed from app_user
@@ -61,11 +73,11 @@ async def google_login_endpoint(firebase_token_model: FirebaseToken = Body(...),
         raise http_exc
     except ValueError as ve:
          # Catch potential ValueErrors from CRUD or token data prep
-         print(f"Value error during login: {ve}")
+         logger.warning("Value error during login: %s", ve)
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         # Catch-all for unexpected errors during the process
-        print(f"Unexpected error during Google login endpoint: {e}")
+        logger.error("Unexpected error during Google login endpoint: %s", e)
         # Consider logging the full traceback here
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
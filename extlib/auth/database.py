@@ -1,6 +1,7 @@
 # extlib/auth/database.py
+import logging
 import os
-from sqlalchemy import String, MetaData, DateTime 
+from sqlalchemy import String, MetaData, DateTime, LargeBinary, event
 from sqlalchemy.sql import func
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -8,8 +9,32 @@ from datetime import datetime,timezone
 # Define the database URL (using a separate file for auth)
 DATABASE_URL = os.environ.get("AUTH_DATABASE_URL", "sqlite+aiosqlite:///./auth.db")
 
-# Create the async engine
-engine = create_async_engine(DATABASE_URL, echo=bool(os.environ.get("DB_ECHO", False)))
+logger = logging.getLogger(__name__)
+
+# Create the async engine with a real pool so concurrent auth traffic isn't
+# serialized on connection setup
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=bool(os.environ.get("DB_ECHO", False)),
+    pool_size=int(os.environ.get("AUTH_DB_POOL_SIZE", 20)),
+    max_overflow=int(os.environ.get("AUTH_DB_MAX_OVERFLOW", 40)),
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    # Generous compiled-SQL cache so the small set of auth statements never
+    # pays SQLAlchemy compile time twice
+    query_cache_size=1200,
+)
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Puts SQLite in WAL mode so readers don't block on writers."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
 
 # Create a configured "Session" class
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
@@ -23,8 +48,10 @@ class Base(AsyncAttrs, DeclarativeBase):
 class User(Base):
     __tablename__ = "users"
 
-    # Your internal primary key - consider UUID if preferred
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, index=True) # Example: UUID as string
+    # Internal primary key: raw uuid4 bytes. Half the size of the old 36-char
+    # string form, so the PK B-tree and every index entry stay smaller.
+    # Hex-encode (id.hex()) at API boundaries.
+    id: Mapped[bytes] = mapped_column(LargeBinary(16), primary_key=True, index=True)
     firebase_uid: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     email: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     name: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -49,7 +76,7 @@ async def create_db_and_tables():
     """Creates database tables if they don't exist."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    print("Database tables checked/created.")
+    logger.info("Database tables checked/created.")
 
 async def get_async_session():
     """Dependency to get an async database session."""
@@ -1,26 +1,39 @@
+import logging
 import os
+import hashlib
+import threading
+import time
 import firebase_admin
-from firebase_admin import credentials, auth
+from cachetools import TTLCache
+from firebase_admin import credentials, auth, _token_gen
 from fastapi import HTTPException, status
 
+logger = logging.getLogger(__name__)
+
 is_firebase_initialized = False
 
+# Short-TTL cache of verified Firebase ID tokens: retries and tab refreshes
+# often replay the same token within seconds, and RSA verification is the
+# expensive part. Failures are never cached.
+_fb_cache: TTLCache = TTLCache(maxsize=2048, ttl=5)
+_fb_cache_lock = threading.Lock()
+
 def initialize_firebase():
     """Initializes the Firebase Admin SDK using credentials from env variable."""
     global is_firebase_initialized
     if is_firebase_initialized:
-        print("Firebase Admin SDK already initialized.")
+        logger.info("Firebase Admin SDK already initialized.")
         return
 
     SERVICE_ACCOUNT_KEY_PATH = os.environ.get("FIREBASE_SERVICE_ACCOUNT_KEY_PATH")
     if not SERVICE_ACCOUNT_KEY_PATH:
-        print("WARNING: FIREBASE_SERVICE_ACCOUNT_KEY_PATH environment variable not set. Firebase Admin SDK not initialized.")
+        logger.warning("FIREBASE_SERVICE_ACCOUNT_KEY_PATH environment variable not set. Firebase Admin SDK not initialized.")
         # Decide how critical this is. Maybe raise an error or log prominently.
         # raise ValueError("FIREBASE_SERVICE_ACCOUNT_KEY_PATH environment variable not set.")
         return # Exit if path not set
 
     if not os.path.exists(SERVICE_ACCOUNT_KEY_PATH):
-        print(f"WARNING: Service account key not found at: {SERVICE_ACCOUNT_KEY_PATH}. Firebase Admin SDK not initialized.")
+        logger.warning("Service account key not found at: %s. Firebase Admin SDK not initialized.", SERVICE_ACCOUNT_KEY_PATH)
         # raise FileNotFoundError(f"Service account key not found at: {SERVICE_ACCOUNT_KEY_PATH}")
         return # Exit if file not found
 
@@ -28,13 +41,31 @@ def initialize_firebase():
         cred = credentials.Certificate(SERVICE_ACCOUNT_KEY_PATH)
         firebase_admin.initialize_app(cred)
         is_firebase_initialized = True
-        print("Firebase Admin SDK initialized successfully.")
+        logger.info("Firebase Admin SDK initialized successfully.")
+        if os.environ.get("AUTH_WARMUP") == "1":
+            _warm_public_key_cache()
     except Exception as e:
         is_firebase_initialized = False
-        print(f"CRITICAL ERROR: Failed to initialize Firebase Admin SDK: {e}")
+        logger.critical("Failed to initialize Firebase Admin SDK: %s", e)
         # Depending on your app's needs, you might want to raise this exception
         # raise RuntimeError(f"Could not initialize Firebase Admin SDK: {e}") from e
 
+def _warm_public_key_cache():
+    """Forces the Google public cert download at startup.
+
+    verify_id_token lazily fetches the signing certs on first use, which
+    would otherwise cost the first login a blocking HTTPS round-trip. A
+    malformed dummy token never triggers that fetch (it is rejected while
+    decoding the header), so the certs URL is requested directly through
+    the verifier's own cache-aware transport.
+    """
+    try:
+        verifier = auth._get_client(None)._token_verifier
+        verifier.request(_token_gen.ID_TOKEN_CERT_URI)
+        logger.info("Firebase public key cache warmed.")
+    except Exception as e:
+        logger.warning("Firebase public key warmup failed: %s", e)
+
 def verify_firebase_token(id_token: str) -> dict:
     """Verifies the Firebase ID token and returns the decoded claims."""
     if not is_firebase_initialized:
@@ -42,15 +73,24 @@ def verify_firebase_token(id_token: str) -> dict:
              status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
              detail="Firebase Admin SDK is not initialized. Cannot verify token."
          )
+    cache_key = hashlib.sha256(id_token.encode()).digest()
+    with _fb_cache_lock:
+        cached = _fb_cache.get(cache_key)
+    if cached is not None:
+        # Honor the token's own expiry even on a cache hit
+        if cached.get("exp", 0) > time.time():
+            return cached
     try:
         decoded_token = auth.verify_id_token(id_token)
-        print(f"Decoded Firebase token: {decoded_token}") # Log the decoded token
+        logger.debug("Decoded Firebase token: %s", decoded_token)
+        with _fb_cache_lock:
+            _fb_cache[cache_key] = decoded_token
         return decoded_token
     except auth.ExpiredIdTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Firebase token has expired")
     except auth.InvalidIdTokenError as e:
-        print(f"Invalid Firebase token error: {e}") # Log detailed error
+        logger.debug("Invalid Firebase token error: %s", e)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid Firebase token: {e}")
     except Exception as e:
-        print(f"Unexpected error verifying Firebase token: {e}") # Log unexpected errors
+        logger.error("Unexpected error verifying Firebase token: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not verify Firebase token due to an internal error.")
@@ -1,16 +1,52 @@
 import os
-import jwt
-from datetime import datetime, timedelta, timezone
+import base64
+import hashlib
+import logging
+import hmac
+import threading
+import time
+
+import orjson
+from cachetools import TTLCache
 from fastapi import HTTPException, status
-from .auth_models import InternalTokenData, TokenPayload
+from .auth_models import InternalTokenData, TokenPayloadFast
+
+logger = logging.getLogger(__name__)
 
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
-print("get:",JWT_SECRET_KEY)
 if JWT_SECRET_KEY == "your-secret-key":
-     print("WARNING: Using default JWT_SECRET_KEY. Please set a strong secret in your environment variables.")
+     logger.warning("Using default JWT_SECRET_KEY. Please set a strong secret in your environment variables.")
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24))
 
+# HS256 signing done by hand: the header never changes and the key never
+# changes, so both are precomputed once instead of re-derived per call.
+_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+# Copying a prepared HMAC object skips the ipad/opad key schedule that
+# hmac.new would otherwise redo on every sign/verify. Left as None when no
+# secret is configured: every token would otherwise be signed (and
+# accepted) under an empty, forgeable key.
+_HMAC_TEMPLATE = (hmac.new(JWT_SECRET_KEY.encode(), None, hashlib.sha256)
+                  if JWT_SECRET_KEY else None)
+
+def _sign_hs256(signing_input: bytes) -> bytes:
+    if _HMAC_TEMPLATE is None:
+        raise RuntimeError(
+            "JWT_SECRET_KEY environment variable is not set; "
+            "refusing to sign or verify tokens without a secret")
+    h = _HMAC_TEMPLATE.copy()
+    h.update(signing_input)
+    return h.digest()
+
+# Short-lived cache of successfully verified tokens so hot endpoints don't
+# re-run HMAC + base64 + model validation on every request. The TTL is kept
+# short so a revoked-but-unexpired token is only accepted for a few extra
+# seconds at most.
+JWT_CACHE_MAXSIZE = int(os.environ.get("JWT_CACHE_MAXSIZE", 10000))
+JWT_CACHE_TTL = int(os.environ.get("JWT_CACHE_TTL", 5))
+_verify_cache: TTLCache = TTLCache(maxsize=JWT_CACHE_MAXSIZE, ttl=JWT_CACHE_TTL)
+_verify_cache_lock = threading.Lock()
+
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="Could not validate credentials",
@@ -22,29 +58,86 @@ expired_token_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+def _encode_hs256(payload: dict) -> str:
+    """Encodes and signs a payload dict as an HS256 JWT."""
+    # orjson emits compact bytes directly, skipping the str -> bytes re-encode
+    payload_b64 = _b64url_encode(orjson.dumps(payload))
+    signing_input = _HEADER_B64 + b'.' + payload_b64
+    signature = _sign_hs256(signing_input)
+    return (signing_input + b'.' + _b64url_encode(signature)).decode()
+
+def _decode_hs256(token: str) -> dict:
+    """Verifies an HS256 JWT signature and expiry, returning the payload dict."""
+    try:
+        header_b64, payload_b64, signature_b64 = token.encode().split(b'.')
+    except ValueError:
+        raise credentials_exception
+    signing_input = header_b64 + b'.' + payload_b64
+    expected = _sign_hs256(signing_input)
+    if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+        raise credentials_exception
+    try:
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except ValueError:
+        raise credentials_exception
+    exp = payload.get("exp")
+    if exp is not None and time.time() > exp:
+        raise expired_token_exception
+    return payload
+
+def _to_claims(token_data: InternalTokenData) -> dict:
+    """Builds the claims dict directly, skipping Pydantic's model_dump schema walk."""
+    claims = {"sub": token_data.sub}
+    if token_data.email is not None:
+        claims["email"] = token_data.email
+    if token_data.firebase_uid is not None:
+        claims["firebase_uid"] = token_data.firebase_uid
+    return claims
+
 def create_internal_access_token(token_data: InternalTokenData) -> str:
     """Creates an internal JWT access token."""
-    to_encode = token_data.model_dump(exclude_unset=True)
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return encoded_jwt
+    to_encode = _to_claims(token_data)
+    # Plain epoch arithmetic: JWT claims are numeric anyway, so building
+    # tz-aware datetimes per token is pure overhead
+    now = int(time.time())
+    to_encode.update({"exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60, "iat": now})
+    return _encode_hs256(to_encode)
 
-def verify_internal_token(token: str) -> TokenPayload:
+def verify_internal_token(token: str) -> TokenPayloadFast:
     """Verifies the internal JWT and returns the payload."""
+    cache_key = hashlib.sha256(token.encode()).digest()[:16]
+    with _verify_cache_lock:
+        cached = _verify_cache.get(cache_key)
+    if cached is not None:
+        token_data, exp = cached
+        # Honor the token's own expiry even while the cache entry is fresh
+        if exp is None or exp > time.time():
+            return token_data
+        raise expired_token_exception
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        token_data = TokenPayload(**payload)
-        if token_data.sub is None:
-             print("Token verification failed: 'sub' claim missing")
+        payload = _decode_hs256(token)
+        sub = payload.get("sub")
+        if sub is None:
+             logger.debug("Token verification failed: 'sub' claim missing")
              raise credentials_exception
+        token_data = TokenPayloadFast(sub=sub,
+                                      email=payload.get("email"),
+                                      firebase_uid=payload.get("firebase_uid"))
+        with _verify_cache_lock:
+            _verify_cache[cache_key] = (token_data, payload.get("exp"))
         return token_data
-    except jwt.ExpiredSignatureError:
-        print("Token verification failed: Expired")
-        raise expired_token_exception
-    except jwt.InvalidTokenError as e:
-        print(f"Token verification failed: Invalid token - {e}")
-        raise credentials_exception
+    except HTTPException:
+        raise
+    except RuntimeError:
+        # Missing JWT_SECRET_KEY is server misconfiguration, not a bad
+        # token; surface it instead of answering 401.
+        raise
     except Exception as e: # Catch potential Pydantic validation errors or others
-         print(f"Token verification failed: Unexpected error - {e}")
+         logger.debug("Token verification failed: Unexpected error - %s", e)
          raise credentials_exception
\ No newline at end of file
@@ -1,30 +1,40 @@
+import logging
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 import uuid
 
-from .database import User 
+from .database import User
 from .auth_models import UserCreate
 
+logger = logging.getLogger(__name__)
+
 async def get_user_by_firebase_uid(db: AsyncSession, firebase_uid: str) -> User | None:
     """Fetches a user by their Firebase UID."""
-    result = await db.execute(select(User).filter(User.firebase_uid == firebase_uid))
+    result = await db.execute(select(User).where(User.firebase_uid == firebase_uid))
     return result.scalars().first()
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     """Fetches a user by their email."""
-    result = await db.execute(select(User).filter(User.email == email))
+    result = await db.execute(select(User).where(User.email == email))
     return result.scalars().first()
 
 async def get_user_by_id(db: AsyncSession, user_id: str) -> User | None:
-    """Fetches a user by their internal ID."""
-    result = await db.execute(select(User).filter(User.id == user_id))
-    return result.scalars().first()
+    """Fetches a user by their internal ID (dashed or bare UUID string)."""
+    try:
+        id_bytes = uuid.UUID(user_id).bytes
+    except ValueError:
+        return None
+    # session.get hits the identity map first and skips SQL entirely when the
+    # instance is already loaded in this session
+    return await db.get(User, id_bytes)
 
 
 async def create_db_user(db: AsyncSession, user_data: UserCreate) -> User:
     """Creates a new user in the database."""
-    internal_id = str(uuid.uuid4())
+    internal_id = uuid.uuid4().bytes
     db_user = User(
         id=internal_id,
         firebase_uid=user_data.firebase_uid,
@@ -33,19 +43,18 @@ async def create_db_user(db: AsyncSession, user_data: UserCreate) -> User:
         picture=str(user_data.picture) if user_data.picture else None
     )
     db.add(db_user)
+    # No refresh: the ORM already has every client-supplied value and the
+    # insert RETURNING populates server defaults on flush.
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
 async def update_db_user(db: AsyncSession, db_user: User, updates: dict) -> User:
      """Updates user information."""
-     await db.execute(
-         sqlalchemy_update(User)
-         .where(User.id == db_user.id)
-         .values(**updates)
-     )
+     # Mutate the tracked instance so the commit issues a single UPDATE and
+     # the in-memory object is already current (no refresh SELECT needed).
+     for key, value in updates.items():
+          setattr(db_user, key, value)
      await db.commit()
-     await db.refresh(db_user) # Refresh to get updated values
      return db_user
 
 async def get_or_create_db_user(db: AsyncSession, decoded_token: dict) -> User:
@@ -61,38 +70,41 @@ async def get_or_create_db_user(db: AsyncSession, decoded_token: dict) -> User:
     if not firebase_uid or not email:
         raise ValueError("Firebase token missing required claims (UID or email).")
 
-    db_user = await get_user_by_firebase_uid(db, firebase_uid=firebase_uid)
+    picture_str = str(picture) if picture else None
 
-    if db_user:
-        print(f"CRUD: Found user by Firebase UID: {db_user.id}")
-        updates_needed = {}
-        if db_user.name != name:
-            updates_needed['name'] = name
-        if db_user.picture != picture:
-            updates_needed['picture'] = str(picture) if picture else None
-
-        if updates_needed:
-             print(f"CRUD: Updating user {db_user.id} with: {updates_needed}")
-             db_user = await update_db_user(db, db_user, updates_needed)
+    # Atomic upsert: one round-trip covers the "known firebase_uid" and the
+    # "brand-new user" cases, refreshing name/picture/email on conflict.
+    stmt = sqlite_insert(User).values(
+        id=uuid.uuid4().bytes,
+        firebase_uid=firebase_uid,
+        email=email,
+        name=name,
+        picture=picture_str,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['firebase_uid'],
+        set_={
+            'name': stmt.excluded.name,
+            'picture': stmt.excluded.picture,
+            'email': stmt.excluded.email,
+        },
+    ).returning(User)
 
+    try:
+        result = await db.execute(stmt)
+        db_user = result.scalars().one()
+        await db.commit()
         return db_user
-    else:
+    except IntegrityError:
+        # The email already belongs to a row with a different firebase_uid
+        # (pre-Firebase account): link that account instead.
+        await db.rollback()
+        logger.debug("CRUD: Found user by email %s, linking Firebase UID %s", email, firebase_uid)
         db_user_by_email = await get_user_by_email(db, email=email)
-        if db_user_by_email:
-             print(f"CRUD: Found user by email {email}, linking Firebase UID {firebase_uid}")
-             updates_needed = {'firebase_uid': firebase_uid}
-             if db_user_by_email.name != name: updates_needed['name'] = name
-             if db_user_by_email.picture != picture: updates_needed['picture'] = str(picture) if picture else None
+        if db_user_by_email is None:
+            raise ValueError(f"Could not create or link user for email {email}.")
+        updates_needed = {'firebase_uid': firebase_uid}
+        if db_user_by_email.name != name: updates_needed['name'] = name
+        if db_user_by_email.picture != picture_str: updates_needed['picture'] = picture_str
 
-             db_user = await update_db_user(db, db_user_by_email, updates_needed)
-             return db_user
-        else:
-             print(f"CRUD: Creating new user for Firebase UID: {firebase_uid}")
-             user_create_data = UserCreate(
-                 firebase_uid=firebase_uid,
-                 email=email,
-                 name=name,
-                 picture=picture
-             )
-             new_user = await create_db_user(db, user_data=user_create_data)
-             return new_user
\ No newline at end of file
+        return await update_db_user(db, db_user_by_email, updates_needed)
\ No newline at end of file
@@ -1,29 +1,35 @@
 import asyncio
 from contextlib import asynccontextmanager
+import functools
 import importlib
 import inspect
 import json
 import logging
+import orjson
 import os
 from pathlib import Path
 import re
 import sys
+import threading
 import traceback
 import graphviz
 from typing import (
     Any, List, Literal, Optional)
 import click
+from cachetools import LRUCache, TTLCache
 from click import Tuple
 from fastapi import (
-    FastAPI, HTTPException, Query, Depends, status)
+    FastAPI, HTTPException, Query, Depends, Response, status)
 from fastapi.middleware.cors import CORSMiddleware
 
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 from opentelemetry import trace
 from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
 from opentelemetry.sdk.trace import export, TracerProvider
+from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
 from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.types import Lifespan
 
 from google.genai import types
@@ -46,16 +52,88 @@ from google.adk.cli.fast_api import ApiServerSpanExporter, AgentRunRequest, AddS
 # import custom session service
 from .custom_sessions import MyDatabaseSessionService
 # import auth dependencies
-from .auth.auth_dependencies import get_current_active_user  # For HTTP routes
+from .auth.auth_dependencies import get_current_user_claims  # For HTTP routes
 # For WebSocket manual check
 from .auth.jwt_handler import verify_internal_token, credentials_exception, expired_token_exception
-from .auth.database import User as DBUser  # Import your SQLAlchemy User model
-from .auth.auth_models import TokenPayload  # To type hint token payload
+from .auth.auth_models import TokenPayloadFast, UserClaims  # To type hint token payload
 from .custom_mongodb_session_service import MongoDBSessionService
 
 
 logger = logging.getLogger(__name__)
 
+# Validation pattern for eval set / eval ids, compiled once at import time
+# instead of going through re's bounded pattern cache per request.
+_EVAL_ID_PATTERN = r"^[a-zA-Z0-9_]+$"
+_EVAL_ID_MATCH = re.compile(_EVAL_ID_PATTERN).fullmatch
+
+# String span attributes longer than this are stored as a preview plus
+# length; set TRACE_FULL_ATTRIBUTES=1 to keep full values (debugging).
+_TRACE_ATTR_PREVIEW_BYTES = int(
+    os.environ.get("TRACE_ATTR_PREVIEW_BYTES", "256"))
+_TRACE_FULL_ATTRIBUTES = os.environ.get("TRACE_FULL_ATTRIBUTES") == "1"
+
+
+class BoundedApiServerSpanExporter(ApiServerSpanExporter):
+    """ApiServerSpanExporter that trims oversized attribute values.
+
+    Prompt/response attributes can run to tens of kilobytes per span; kept
+    verbatim they dominate tracing memory. Store a fixed-size preview plus
+    the original length instead, and let the caller hand in a bounded
+    mapping (an LRUCache) as trace_dict so total retention is capped too.
+
+    cachetools caches are not thread-safe (even reads reorder the LRU
+    list), and export runs on the BatchSpanProcessor's background thread
+    while /debug/trace reads from a request thread, so every access goes
+    through the shared lock.
+    """
+
+    def __init__(self, trace_dict, lock: threading.Lock):
+        super().__init__(trace_dict)
+        self._lock = lock
+
+    def export(self, spans) -> export.SpanExportResult:
+        for span in spans:
+            if (
+                span.name == "call_llm"
+                or span.name == "send_data"
+                or span.name.startswith("tool_response")
+            ):
+                attributes = {}
+                for key, value in span.attributes.items():
+                    if (
+                        not _TRACE_FULL_ATTRIBUTES
+                        and isinstance(value, str)
+                        and len(value) > _TRACE_ATTR_PREVIEW_BYTES
+                    ):
+                        value = {
+                            "_type": type(value).__name__,
+                            "_len": len(value),
+                            "_preview": value[:_TRACE_ATTR_PREVIEW_BYTES],
+                        }
+                    attributes[key] = value
+                attributes["trace_id"] = span.get_span_context().trace_id
+                attributes["span_id"] = span.get_span_context().span_id
+                if attributes.get("gcp.vertex.agent.event_id", None):
+                    with self._lock:
+                        self.trace_dict[
+                            attributes["gcp.vertex.agent.event_id"]] = attributes
+        return export.SpanExportResult.SUCCESS
+
+
+# Rendered dot sources keyed by (app_name, highlights); the agent topology
+# only changes on restart, so identical highlight sets render identically.
+_graph_source_cache: LRUCache = LRUCache(maxsize=512)
+
+
+def _build_graph_source(root_agent, highlights) -> Optional[str]:
+    """Builds the agent graph and returns its dot source (worker thread)."""
+    from . import agent_graph
+
+    dot_graph = agent_graph.get_agent_graph(root_agent, list(highlights))
+    if dot_graph and isinstance(dot_graph, graphviz.Digraph):
+        return dot_graph.source
+    return None
+
 
 def get_my_fast_api_app(
     *,
@@ -66,15 +144,47 @@ def get_my_fast_api_app(
     trace_to_cloud: bool = False,
     lifespan: Optional[Lifespan[FastAPI]] = None,
 ) -> FastAPI:
-    trace_dict: dict[str, Any] = {}
-
-    provider = TracerProvider()
+    # Bounded: a plain dict grows with every traced event for the life of
+    # the process. Guarded by a lock shared with the exporter, as
+    # jwt_handler does for its TTLCache.
+    trace_dict: LRUCache = LRUCache(maxsize=10_000)
+    trace_dict_lock = threading.Lock()
+
+    # Head-sample traces so steady-state traffic doesn't pay full tracing
+    # cost (span creation, attribute capture, trace_dict growth). Set
+    # OTEL_TRACES_SAMPLER_ARG=1.0 to trace everything, e.g. when the
+    # /debug/trace endpoint must see every event.
+    sample_ratio = float(os.environ.get("OTEL_TRACES_SAMPLER_ARG", "0.05"))
+    provider = TracerProvider(sampler=ParentBasedTraceIdRatio(sample_ratio))
+    # SimpleSpanProcessor exports synchronously inside the request path,
+    # costing ~1-2ms per span. Batch instead: the exporter only writes into
+    # the in-memory trace_dict under trace_dict_lock, so draining it from
+    # the batcher's background thread is safe.
     provider.add_span_processor(
-        export.SimpleSpanProcessor(ApiServerSpanExporter(trace_dict))
+        export.BatchSpanProcessor(
+            BoundedApiServerSpanExporter(trace_dict, trace_dict_lock),
+            max_queue_size=2048,
+            max_export_batch_size=512,
+            schedule_delay_millis=5000,
+        )
     )
     if trace_to_cloud:
         envs.load_dotenv_for_agent("", agent_dir)
-        if project_id := os.environ.get("GOOGLE_CLOUD_PROJECT", None):
+        if otlp_endpoint := os.environ.get(
+                "OTEL_EXPORTER_OTLP_ENDPOINT", None):
+            # Ship spans to a local OTLP collector sidecar and let it batch
+            # and forward to Cloud Trace. With several workers this keeps one
+            # cross-worker batcher instead of N in-process CloudTrace
+            # exporters each holding buffers and making their own RPCs.
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+                OTLPSpanExporter,
+            )
+            provider.add_span_processor(
+                export.BatchSpanProcessor(
+                    OTLPSpanExporter(endpoint=otlp_endpoint, insecure=True)
+                )
+            )
+        elif project_id := os.environ.get("GOOGLE_CLOUD_PROJECT", None):
             processor = export.BatchSpanProcessor(
                 CloudTraceSpanExporter(project_id=project_id)
             )
@@ -100,7 +210,12 @@ def get_my_fast_api_app(
         else:
             yield
 
-    app = FastAPI(lifespan=internal_lifespan)
+    app = FastAPI(
+        lifespan=internal_lifespan,
+        # orjson-backed encoding for every JSON response that doesn't build
+        # its body by hand.
+        default_response_class=ORJSONResponse,
+    )
 
     if allow_origins:
         app.add_middleware(
@@ -116,6 +231,11 @@ def get_my_fast_api_app(
 
     runner_dict = {}
     root_agent_dict = {}
+    # Per-app locks so concurrent first requests build each agent/runner once.
+    _agent_locks: dict[str, asyncio.Lock] = {}
+    # Apps whose .env has already been loaded; the parse (disk read + line
+    # parsing) only needs to happen once per app, not per runner rebuild.
+    _loaded_dotenvs: set[str] = set()
 
     # Build the Artifact service
     artifact_service = InMemoryArtifactService()
@@ -139,83 +259,123 @@ def get_my_fast_api_app(
     else:
         session_service = InMemorySessionService()
 
+    # Database-backed session services do blocking I/O; dispatch their calls
+    # to the threadpool so async routes never stall the event loop. The
+    # in-memory service is pure dict work and is called inline.
+    _session_service_blocking = not isinstance(
+        session_service, InMemorySessionService)
+
+    async def _svc(func, /, **kwargs):
+        if _session_service_blocking:
+            return await run_in_threadpool(functools.partial(func, **kwargs))
+        return func(**kwargs)
+
+    # The app directory changes only on deploy, so the listing is cached
+    # briefly instead of paying listdir + a stat per entry on every request.
+    _list_apps_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+    _list_apps_lock = threading.Lock()
+
     @app.get("/list-apps")
     def list_apps() -> list[str]:
         base_path = Path.cwd() / agent_dir
+        with _list_apps_lock:
+            cached = _list_apps_cache.get(str(base_path))
+        if cached is not None:
+            return cached
         if not base_path.exists():
             raise HTTPException(status_code=404, detail="Path not found")
         if not base_path.is_dir():
             raise HTTPException(status_code=400, detail="Not a directory")
-        agent_names = [
-            x
-            for x in os.listdir(base_path)
-            if os.path.isdir(os.path.join(base_path, x))
-            and not x.startswith(".")
-            and x != "__pycache__"
-        ]
-        agent_names.sort()
+        # scandir surfaces is_dir() from the directory read itself, avoiding
+        # the extra stat per entry that os.path.isdir costs.
+        with os.scandir(base_path) as entries:
+            agent_names = sorted(
+                entry.name
+                for entry in entries
+                if entry.is_dir()
+                and not entry.name.startswith(".")
+                and entry.name != "__pycache__"
+            )
+        with _list_apps_lock:
+            _list_apps_cache[str(base_path)] = agent_names
         return agent_names
 
     @app.get("/debug/trace/{event_id}")
     def get_trace_dict(event_id: str) -> Any:
-        event_dict = trace_dict.get(event_id, None)
+        with trace_dict_lock:
+            event_dict = trace_dict.get(event_id, None)
         if event_dict is None:
             raise HTTPException(status_code=404, detail="Trace not found")
         return event_dict
 
     @app.get(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}",
-        response_model_exclude_none=True,
+        response_model=None,
     )
-    def get_session(app_name: str, user_id: str, session_id: str,
-                    current_user: DBUser = Depends(
-                        get_current_active_user)  # Add dependency
-                    ) -> Session:
+    async def get_session(app_name: str, user_id: str, session_id: str,
+                          current_user: UserClaims = Depends(
+                              get_current_user_claims)  # Add dependency
+                          ) -> ORJSONResponse:
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                                 detail="Not authorized to access this user's session")
 
         app_name = agent_engine_id if agent_engine_id else app_name
-        session = session_service.get_session(
+        session = await _svc(
+            session_service.get_session,
             app_name=app_name, user_id=user_id, session_id=session_id
         )
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
-        return session
+        # The session service already returns a validated Session; dump it
+        # directly rather than paying a second pydantic validation pass.
+        return ORJSONResponse(
+            session.model_dump(mode="json", exclude_none=True, by_alias=True))
 
     @app.get(
         "/apps/{app_name}/users/{user_id}/sessions",
-        response_model_exclude_none=True,
+        response_model=None,
     )
-    def list_sessions(app_name: str, user_id: str,
-                      current_user: DBUser = Depends(
-                          get_current_active_user)  # Add dependency
-                      ) -> list[Session]:
+    async def list_sessions(app_name: str, user_id: str,
+                            current_user: UserClaims = Depends(
+                                get_current_user_claims)  # Add dependency
+                            ) -> ORJSONResponse:
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                                 detail="Not authorized to access this user's sessions")
         # Connect to managed session if agent_engine_id is set.
         app_name = agent_engine_id if agent_engine_id else app_name
-        return [
-            session
-            for session in session_service.list_sessions(
-                app_name=app_name, user_id=user_id
-            ).sessions
-            # Remove sessions that were generated as a part of Eval.
-            if not session.id.startswith(EVAL_SESSION_ID_PREFIX)
-        ]
+        list_response = await _svc(
+            session_service.list_sessions, app_name=app_name, user_id=user_id
+        )
+        if isinstance(session_service, MyDatabaseSessionService):
+            # Eval sessions were already excluded in the SQL WHERE clause.
+            sessions = list_response.sessions
+        else:
+            sessions = [
+                session
+                for session in list_response.sessions
+                # Remove sessions that were generated as a part of Eval.
+                if not session.id.startswith(EVAL_SESSION_ID_PREFIX)
+            ]
+        # Sessions come out of the service already validated; dump them
+        # directly instead of re-validating through the response model.
+        return ORJSONResponse([
+            session.model_dump(mode="json", exclude_none=True, by_alias=True)
+            for session in sessions
+        ])
 
     @app.post(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}",
         response_model_exclude_none=True,
     )
-    def create_session_with_id(
+    async def create_session_with_id(
             app_name: str,
             user_id: str,
             session_id: str,
             state: Optional[dict[str, Any]] = None,
-            current_user: DBUser = Depends(
-                get_current_active_user)  # Add dependency
+            current_user: UserClaims = Depends(
+                get_current_user_claims)  # Add dependency
     ) -> Session:
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
@@ -223,7 +383,8 @@ def get_my_fast_api_app(
         # Connect to managed session if agent_engine_id is set.
         app_name = agent_engine_id if agent_engine_id else app_name
         if (
-                session_service.get_session(
+                await _svc(
+                    session_service.get_session,
                     app_name=app_name, user_id=user_id, session_id=session_id
                 )
                 is not None
@@ -234,7 +395,8 @@ def get_my_fast_api_app(
             )
 
         logger.info("New session created: %s", session_id)
-        return session_service.create_session(
+        return await _svc(
+            session_service.create_session,
             app_name=app_name, user_id=user_id, state=state, session_id=session_id
         )
 
@@ -242,12 +404,12 @@ def get_my_fast_api_app(
         "/apps/{app_name}/users/{user_id}/sessions",
         response_model_exclude_none=True,
     )
-    def create_session(
+    async def create_session(
             app_name: str,
             user_id: str,
             state: Optional[dict[str, Any]] = None,
-            current_user: DBUser = Depends(
-                get_current_active_user)  # Add dependency
+            current_user: UserClaims = Depends(
+                get_current_user_claims)  # Add dependency
     ) -> Session:
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
@@ -256,7 +418,8 @@ def get_my_fast_api_app(
         app_name = agent_engine_id if agent_engine_id else app_name
 
         logger.info("New session created")
-        return session_service.create_session(
+        return await _svc(
+            session_service.create_session,
             app_name=app_name, user_id=user_id, state=state
         )
 
@@ -267,6 +430,32 @@ def get_my_fast_api_app(
             eval_set_id + _EVAL_SET_FILE_EXTENSION,
         )
 
+    # Eval-set files are small but were re-read and re-parsed on every
+    # request, with the blocking I/O sitting inside async routes. Cache the
+    # parsed payload keyed by path, invalidated by mtime, and do the actual
+    # file I/O in a worker thread. A name index is kept alongside the data
+    # so existence checks don't rescan the records on every call.
+    _eval_set_cache: dict[str, tuple[float, Any, set[str]]] = {}
+
+    async def _load_eval_set(path: str) -> tuple[Any, set[str]]:
+        mtime = os.stat(path).st_mtime
+        cached = _eval_set_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+        data = orjson.loads(await asyncio.to_thread(Path(path).read_bytes))
+        names = {record["name"] for record in data}
+        _eval_set_cache[path] = (mtime, data, names)
+        return data, names
+
+    async def _write_eval_set(path: str, data: Any) -> None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        await asyncio.to_thread(Path(path).write_bytes, payload)
+        _eval_set_cache[path] = (
+            os.stat(path).st_mtime,
+            data,
+            {record["name"] for record in data},
+        )
+
     @app.post(
         "/apps/{app_name}/eval_sets/{eval_set_id}",
         response_model_exclude_none=True,
@@ -276,13 +465,12 @@ def get_my_fast_api_app(
             eval_set_id: str,
     ):
         """Creates an eval set, given the id."""
-        pattern = r"^[a-zA-Z0-9_]+$"
-        if not bool(re.fullmatch(pattern, eval_set_id)):
+        if not _EVAL_ID_MATCH(eval_set_id):
             raise HTTPException(
                 status_code=400,
                 detail=(
-                    f"Invalid eval set id. Eval set id should have the `{pattern}`"
-                    " format"
+                    "Invalid eval set id. Eval set id should have the"
+                    f" `{_EVAL_ID_PATTERN}` format"
                 ),
             )
         # Define the file path
@@ -296,9 +484,8 @@ def get_my_fast_api_app(
             # Write the JSON string to the file
             logger.info(
                 "Eval set file doesn't exist, we will create a new one.")
-            with open(new_eval_set_path, "w") as f:
-                empty_content = json.dumps([], indent=2)
-                f.write(empty_content)
+            with open(new_eval_set_path, "wb") as f:
+                f.write(orjson.dumps([], option=orjson.OPT_INDENT_2))
 
     @app.get(
         "/apps/{app_name}/eval_sets",
@@ -324,15 +511,18 @@ def get_my_fast_api_app(
     async def add_session_to_eval_set(
             app_name: str, eval_set_id: str, req: AddSessionToEvalSetRequest
     ):
-        pattern = r"^[a-zA-Z0-9_]+$"
-        if not bool(re.fullmatch(pattern, req.eval_id)):
+        if not _EVAL_ID_MATCH(req.eval_id):
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid eval id. Eval id should have the `{pattern}` format",
+                detail=(
+                    "Invalid eval id. Eval id should have the"
+                    f" `{_EVAL_ID_PATTERN}` format"
+                ),
             )
 
         # Get the session
-        session = session_service.get_session(
+        session = await _svc(
+            session_service.get_session,
             app_name=app_name, user_id=req.user_id, session_id=req.session_id
         )
         assert session, "Session not found."
@@ -340,10 +530,12 @@ def get_my_fast_api_app(
         eval_set_file_path = _get_eval_set_file_path(
             app_name, agent_dir, eval_set_id
         )
-        with open(eval_set_file_path, "r") as file:
-            eval_set_data = json.load(file)  # Load JSON into a list
+        eval_set_data, existing_names = await _load_eval_set(
+            eval_set_file_path)
 
-        if [x for x in eval_set_data if x["name"] == req.eval_id]:
+        # O(1) membership check against the cached name index instead of
+        # scanning (and materializing a list of) every record.
+        if req.eval_id in existing_names:
             raise HTTPException(
                 status_code=400,
                 detail=(
@@ -370,14 +562,13 @@ def get_my_fast_api_app(
             },
         })
         # Serialize the test data to JSON and write to the eval set file.
-        with open(eval_set_file_path, "w") as f:
-            f.write(json.dumps(eval_set_data, indent=2))
+        await _write_eval_set(eval_set_file_path, eval_set_data)
 
     @app.get(
         "/apps/{app_name}/eval_sets/{eval_set_id}/evals",
         response_model_exclude_none=True,
     )
-    def list_evals_in_eval_set(
+    async def list_evals_in_eval_set(
             app_name: str,
             eval_set_id: str,
     ) -> list[str]:
@@ -386,10 +577,9 @@ def get_my_fast_api_app(
         eval_set_file_path = _get_eval_set_file_path(
             app_name, agent_dir, eval_set_id
         )
-        with open(eval_set_file_path, "r") as file:
-            eval_set_data = json.load(file)  # Load JSON into a list
+        _, names = await _load_eval_set(eval_set_file_path)
 
-        return sorted([x["name"] for x in eval_set_data])
+        return sorted(names)
 
     @app.post(
         "/apps/{app_name}/eval_sets/{eval_set_id}/run_eval",
@@ -439,13 +629,14 @@ def get_my_fast_api_app(
         return run_eval_results
 
     @app.delete("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
-    def delete_session(app_name: str, user_id: str, session_id: str,
-                       current_user: DBUser = Depends(
-                           get_current_active_user)  # Add dependency
-                       ):
+    async def delete_session(app_name: str, user_id: str, session_id: str,
+                             current_user: UserClaims = Depends(
+                                 get_current_user_claims)  # Add dependency
+                             ):
         # Connect to managed session if agent_engine_id is set.
         app_name = agent_engine_id if agent_engine_id else app_name
-        session_service.delete_session(
+        await _svc(
+            session_service.delete_session,
             app_name=app_name, user_id=user_id, session_id=session_id
         )
         logger.info("Session deleted: %s", session_id)
@@ -455,14 +646,14 @@ def get_my_fast_api_app(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts/{artifact_name}",
         response_model_exclude_none=True,
     )
-    def load_artifact(
+    async def load_artifact(
             app_name: str,
             user_id: str,
             session_id: str,
             artifact_name: str,
             version: Optional[int] = Query(None),
-            current_user: DBUser = Depends(
-                get_current_active_user)  # Add dependency
+            current_user: UserClaims = Depends(
+                get_current_user_claims)  # Add dependency
     ) -> Optional[types.Part]:
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
@@ -483,14 +674,14 @@ def get_my_fast_api_app(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts/{artifact_name}/versions/{version_id}",
         response_model_exclude_none=True,
     )
-    def load_artifact_version(
+    async def load_artifact_version(
             app_name: str,
             user_id: str,
             session_id: str,
             artifact_name: str,
             version_id: int,
-            current_user: DBUser = Depends(
-                get_current_active_user)  # Add dependency
+            current_user: UserClaims = Depends(
+                get_current_user_claims)  # Add dependency
     ) -> Optional[types.Part]:
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
@@ -511,7 +702,7 @@ def get_my_fast_api_app(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts",
         response_model_exclude_none=True,
     )
-    def list_artifact_names(
+    async def list_artifact_names(
             app_name: str, user_id: str, session_id: str
     ) -> list[str]:
         app_name = agent_engine_id if agent_engine_id else app_name
@@ -523,7 +714,7 @@ def get_my_fast_api_app(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts/{artifact_name}/versions",
         response_model_exclude_none=True,
     )
-    def list_artifact_versions(
+    async def list_artifact_versions(
             app_name: str, user_id: str, session_id: str, artifact_name: str
     ) -> list[int]:
         app_name = agent_engine_id if agent_engine_id else app_name
@@ -537,7 +728,7 @@ def get_my_fast_api_app(
     @app.delete(
         "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts/{artifact_name}",
     )
-    def delete_artifact(
+    async def delete_artifact(
             app_name: str, user_id: str, session_id: str, artifact_name: str
     ):
         app_name = agent_engine_id if agent_engine_id else app_name
@@ -548,11 +739,12 @@ def get_my_fast_api_app(
             filename=artifact_name,
         )
 
-    @app.post("/run", response_model_exclude_none=True)
-    async def agent_run(req: AgentRunRequest) -> list[Event]:
+    @app.post("/run", response_model=None)
+    async def agent_run(req: AgentRunRequest) -> Response:
         # Connect to managed session if agent_engine_id is set.
         app_id = agent_engine_id if agent_engine_id else req.app_name
-        session = session_service.get_session(
+        session = await _svc(
+            session_service.get_session,
             app_name=app_id, user_id=req.user_id, session_id=req.session_id
         )
         if not session:
@@ -568,14 +760,20 @@ def get_my_fast_api_app(
         ]
         logger.info("Generated %s events in agent run: %s",
                     len(events), events)
-        return events
+        # Serialize once with orjson instead of letting FastAPI re-validate
+        # and re-encode the event list through pydantic; for event-heavy runs
+        # this is the response hot path.
+        body = orjson.dumps(
+            [e.model_dump(mode="json", exclude_none=True, by_alias=True) for e in events])
+        return Response(body, media_type="application/json")
 
     @app.post("/run_sse")
     async def agent_run_sse(req: AgentRunRequest) -> StreamingResponse:
         # Connect to managed session if agent_engine_id is set.
         app_id = agent_engine_id if agent_engine_id else req.app_name
         # SSE endpoint
-        session = session_service.get_session(
+        session = await _svc(
+            session_service.get_session,
             app_name=app_id, user_id=req.user_id, session_id=req.session_id
         )
         if not session:
@@ -592,16 +790,18 @@ def get_my_fast_api_app(
                         new_message=req.new_message,
                         run_config=RunConfig(streaming_mode=stream_mode),
                 ):
-                    # Format as SSE data
-                    sse_event = event.model_dump_json(
-                        exclude_none=True, by_alias=True)
+                    # Format as SSE data. orjson.dumps of the plain dict is
+                    # faster than model_dump_json, and yielding bytes lets
+                    # starlette skip re-encoding the chunk to UTF-8.
+                    payload = orjson.dumps(
+                        event.model_dump(mode="json", exclude_none=True, by_alias=True))
                     logger.info(
-                        "Generated event in agent run streaming: %s", sse_event)
-                    yield f"data: {sse_event}\n\n"
+                        "Generated event in agent run streaming: %s", payload)
+                    yield b"data: " + payload + b"\n\n"
             except Exception as e:
                 logger.exception("Error in event_generator: %s", e)
                 # You might want to yield an error event here
-                yield f'data: {{"error": "{str(e)}"}}\n\n'
+                yield b"data: " + orjson.dumps({"error": str(e)}) + b"\n\n"
 
         # Returns a streaming response with the proper media type for SSE
         return StreamingResponse(
@@ -615,54 +815,60 @@ def get_my_fast_api_app(
     )
     async def get_event_graph(
             app_name: str, user_id: str, session_id: str, event_id: str,
-            current_user: DBUser = Depends(
-                get_current_active_user)  # Add dependency
+            current_user: UserClaims = Depends(
+                get_current_user_claims)  # Add dependency
     ):
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                                 detail="Not authorized to access this user's session")
         # Connect to managed session if agent_engine_id is set.
         app_id = agent_engine_id if agent_engine_id else app_name
-        session = session_service.get_session(
-            app_name=app_id, user_id=user_id, session_id=session_id
-        )
-        session_events = session.events if session else []
-        event = next((x for x in session_events if x.id == event_id), None)
+        if isinstance(session_service, MyDatabaseSessionService):
+            # Single-row lookup: no need to load the whole session and scan
+            # its events to find one by id.
+            event = await _svc(
+                session_service.get_event,
+                app_name=app_id, user_id=user_id,
+                session_id=session_id, event_id=event_id,
+            )
+        else:
+            session = await _svc(
+                session_service.get_session,
+                app_name=app_id, user_id=user_id, session_id=session_id
+            )
+            session_events = session.events if session else []
+            event = next(
+                (x for x in session_events if x.id == event_id), None)
         if not event:
             return {}
 
-        from . import agent_graph
-
         function_calls = event.get_function_calls()
         function_responses = event.get_function_responses()
         root_agent = await _get_root_agent_async(app_name)
-        dot_graph = None
         if function_calls:
-            function_call_highlights = []
-            for function_call in function_calls:
-                from_name = event.author
-                to_name = function_call.name
-                function_call_highlights.append((from_name, to_name))
-                dot_graph = agent_graph.get_agent_graph(
-                    root_agent, function_call_highlights
-                )
+            highlights = tuple(
+                (event.author, function_call.name)
+                for function_call in function_calls
+            )
         elif function_responses:
-            function_responses_highlights = []
-            for function_response in function_responses:
-                from_name = function_response.name
-                to_name = event.author
-                function_responses_highlights.append((from_name, to_name))
-                dot_graph = agent_graph.get_agent_graph(
-                    root_agent, function_responses_highlights
-                )
-        else:
-            from_name = event.author
-            to_name = ""
-            dot_graph = agent_graph.get_agent_graph(
-                root_agent, [(from_name, to_name)]
+            highlights = tuple(
+                (function_response.name, event.author)
+                for function_response in function_responses
             )
-        if dot_graph and isinstance(dot_graph, graphviz.Digraph):
-            return {"dot_src": dot_graph.source}
+        else:
+            highlights = ((event.author, ""),)
+        # Graph construction and dot-source rendering are pure CPU work;
+        # keep them off the event loop and memoize per highlight set since
+        # the agent topology is fixed for the process.
+        cache_key = (app_name, highlights)
+        if cache_key in _graph_source_cache:
+            dot_src = _graph_source_cache[cache_key]
+        else:
+            dot_src = await asyncio.to_thread(
+                _build_graph_source, root_agent, highlights)
+            _graph_source_cache[cache_key] = dot_src
+        if dot_src is not None:
+            return {"dot_src": dot_src}
         else:
             return {}
 
@@ -680,7 +886,7 @@ def get_my_fast_api_app(
 
     ) -> None:
         authenticated_user_id: Optional[str] = None  # Initialize
-        token_payload: Optional[TokenPayload] = None
+        token_payload: Optional[TokenPayloadFast] = None
 
         # --- WebSocket Authentication Step ---
         if not token:
@@ -724,7 +930,8 @@ def get_my_fast_api_app(
         # --- WebSocket Authentication Finished ---
         # Connect to managed session if agent_engine_id is set.
         app_id = agent_engine_id if agent_engine_id else app_name
-        session = session_service.get_session(
+        session = await _svc(
+            session_service.get_session,
             app_name=app_id, user_id=user_id, session_id=session_id
         )
         if not session:
@@ -734,15 +941,27 @@ def get_my_fast_api_app(
             return
 
         live_request_queue = LiveRequestQueue()
+        # Bounded buffer between the runner and the socket: when the client
+        # drains slowly, put() blocks and backpressure reaches run_live
+        # instead of events queueing without limit.
+        event_queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=64)
 
-        async def forward_events():
+        async def pump_events():
             runner = await _get_runner_async(app_name)
             async for event in runner.run_live(
                     session=session, live_request_queue=live_request_queue
             ):
-                await websocket.send_text(
-                    event.model_dump_json(exclude_none=True, by_alias=True)
+                # Same serialization fast path as the SSE generator; bytes
+                # frames skip the extra encode in send_text.
+                await event_queue.put(
+                    orjson.dumps(
+                        event.model_dump(mode="json", exclude_none=True, by_alias=True))
                 )
+            await event_queue.put(None)
+
+        async def forward_events():
+            while (payload := await event_queue.get()) is not None:
+                await websocket.send_bytes(payload)
 
         async def process_messages():
             try:
@@ -754,21 +973,17 @@ def get_my_fast_api_app(
             except ValidationError as ve:
                 logger.error("Validation error in process_messages: %s", ve)
 
-        # Run both tasks concurrently and cancel all if one fails.
-        tasks = [
-            asyncio.create_task(forward_events()),
-            asyncio.create_task(process_messages()),
-        ]
-        done, pending = await asyncio.wait(
-            tasks, return_when=asyncio.FIRST_EXCEPTION
-        )
+        # Run all tasks concurrently; TaskGroup cancels the siblings as soon
+        # as one of them fails.
         try:
-            # This will re-raise any exception from the completed tasks.
-            for task in done:
-                task.result()
-        except WebSocketDisconnect:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(pump_events())
+                tg.create_task(forward_events())
+                tg.create_task(process_messages())
+        except* WebSocketDisconnect:
             logger.info("Client disconnected during process_messages.")
-        except Exception as e:
+        except* Exception as eg:
+            e = eg.exceptions[0]
             error_message = str(e)
             error_type = type(e).__name__
             logger.exception(
@@ -788,45 +1003,59 @@ def get_my_fast_api_app(
             except Exception as send_error:
                 logger.error(
                     "Failed to send error message to client: %s", send_error)
-        finally:
-            for task in pending:
-                task.cancel()
 
     async def _get_root_agent_async(app_name: str) -> Agent:
         """Returns the root agent for the given app."""
         if app_name in root_agent_dict:
             return root_agent_dict[app_name]
-        agent_module = importlib.import_module(app_name)
-        if getattr(agent_module.agent, "root_agent"):
-            root_agent = agent_module.agent.root_agent
-        else:
-            raise ValueError(f'Unable to find "root_agent" from {app_name}.')
-
-        # Handle an awaitable root agent and await for the actual agent.
-        if inspect.isawaitable(root_agent):
-            try:
-                agent, exit_stack = await root_agent
-                exit_stacks.append(exit_stack)
-                root_agent = agent
-            except Exception as e:
-                raise RuntimeError(f"error getting root agent, {e}") from e
-
-        root_agent_dict[app_name] = root_agent
-        return root_agent
+        # Single-flight per app: concurrent first hits would otherwise import
+        # and initialize the same agent module in parallel.
+        lock = _agent_locks.setdefault(app_name, asyncio.Lock())
+        async with lock:
+            if app_name in root_agent_dict:
+                return root_agent_dict[app_name]
+            # The import does file I/O and bytecode compilation; keep it off
+            # the event loop.
+            agent_module = await asyncio.to_thread(
+                importlib.import_module, app_name)
+            if getattr(agent_module.agent, "root_agent"):
+                root_agent = agent_module.agent.root_agent
+            else:
+                raise ValueError(
+                    f'Unable to find "root_agent" from {app_name}.')
+
+            # Handle an awaitable root agent and await for the actual agent.
+            if inspect.isawaitable(root_agent):
+                try:
+                    agent, exit_stack = await root_agent
+                    exit_stacks.append(exit_stack)
+                    root_agent = agent
+                except Exception as e:
+                    raise RuntimeError(
+                        f"error getting root agent, {e}") from e
+
+            root_agent_dict[app_name] = root_agent
+            return root_agent
 
     async def _get_runner_async(app_name: str) -> Runner:
         """Returns the runner for the given app."""
-        envs.load_dotenv_for_agent(os.path.basename(app_name), agent_dir)
         if app_name in runner_dict:
             return runner_dict[app_name]
+        if app_name not in _loaded_dotenvs:
+            envs.load_dotenv_for_agent(os.path.basename(app_name), agent_dir)
+            _loaded_dotenvs.add(app_name)
         root_agent = await _get_root_agent_async(app_name)
-        runner = Runner(
-            app_name=agent_engine_id if agent_engine_id else app_name,
-            agent=root_agent,
-            artifact_service=artifact_service,
-            session_service=session_service,
-            memory_service=memory_service,
-        )
-        runner_dict[app_name] = runner
-        return runner
+        lock = _agent_locks.setdefault(app_name, asyncio.Lock())
+        async with lock:
+            if app_name in runner_dict:
+                return runner_dict[app_name]
+            runner = Runner(
+                app_name=agent_engine_id if agent_engine_id else app_name,
+                agent=root_agent,
+                artifact_service=artifact_service,
+                session_service=session_service,
+                memory_service=memory_service,
+            )
+            runner_dict[app_name] = runner
+            return runner
     return app
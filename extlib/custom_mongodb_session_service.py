@@ -1,17 +1,18 @@
+import atexit
 import base64
-import copy
 import logging
+import threading
+import time
 import uuid
-from datetime import datetime,timezone
-
 from typing import Any, Optional, Dict, List, Set
 
 import pymongo
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import InsertOne, MongoClient, ReturnDocument, ASCENDING, DESCENDING
 from pymongo.collection import Collection
 from pymongo.database import Database
 from pymongo.errors import ConnectionFailure, ConfigurationError, PyMongoError, DuplicateKeyError
 from pymongo.client_session import ClientSession
+from pymongo.write_concern import WriteConcern
 from typing_extensions import override
 
 from google.adk.events.event import Event
@@ -28,6 +29,43 @@ EVENTS_COLLECTION = "events"
 APP_STATES_COLLECTION = "app_states"
 USER_STATES_COLLECTION = "user_states"
 
+# Upper bound on events kept on the in-memory Session object. Storage is the
+# source of truth; the local list only serves callers that inspect the
+# session they already hold, so long-running agents should not grow it
+# without bound.
+MAX_IN_MEMORY_EVENTS = 512
+
+# How long cached app/user state documents stay fresh. These change rarely
+# compared to event volume, so a short TTL removes most state reads without
+# letting cross-process writes go unseen for long.
+STATE_CACHE_TTL_SECONDS = 30.0
+
+# One MongoClient (and one round of index creation) per target, no matter
+# how many service instances get constructed: each client owns a connection
+# pool, and re-running create_index costs several RTTs per instantiation.
+_CLIENT_CACHE: Dict[str, MongoClient] = {}
+_INDEXED_DBS: Set[str] = set()
+_client_cache_lock = threading.Lock()
+
+
+def _close_cached_clients() -> None:
+    with _client_cache_lock:
+        for client in _CLIENT_CACHE.values():
+            client.close()
+        _CLIENT_CACHE.clear()
+
+
+atexit.register(_close_cached_clients)
+
+# First-character dispatch for state-key prefixes (their initials are
+# distinct), so classifying a key costs one dict lookup and at most one
+# startswith instead of three.
+_PREFIX_TABLE = {
+    State.APP_PREFIX[0]: (State.APP_PREFIX, "app"),
+    State.USER_PREFIX[0]: (State.USER_PREFIX, "user"),
+    State.TEMP_PREFIX[0]: (State.TEMP_PREFIX, "temp"),
+}
+
 class MongoDBSessionService(BaseSessionService):
     """A session service that uses MongoDB for storage."""
 
@@ -41,111 +79,233 @@ class MongoDBSessionService(BaseSessionService):
         Raises:
             ValueError: If connection to MongoDB fails.
         """
-        print(f"MongoDB connection string: {db_url}")  # Debugging line to check the connection string
         try:
-            self._client: MongoClient = MongoClient(db_url)
-            self._client.admin.command('ping')
+            with _client_cache_lock:
+                client = _CLIENT_CACHE.get(db_url)
+                if client is None:
+                    client = MongoClient(
+                        db_url,
+                        maxPoolSize=50,
+                        minPoolSize=5,
+                        # Negotiated with the server; silently skipped when
+                        # the driver lacks the optional zstd/snappy packages.
+                        compressors="zstd,snappy",
+                        retryWrites=True,
+                        waitQueueTimeoutMS=2000,
+                    )
+                    client.admin.command('ping')
+                    _CLIENT_CACHE[db_url] = client
+            self._client: MongoClient = client
 
         except (ConnectionFailure, ConfigurationError, PyMongoError) as e:
             raise ValueError(f"Failed to connect to MongoDB or configuration error: {str(e)}") from e
 
         self._db: Database = self._client[db_name]
         self._sessions_collection: Collection = self._db[SESSIONS_COLLECTION]
-        self._events_collection: Collection = self._db[EVENTS_COLLECTION]
+        # Events are append-only and reconstructible from the agent run;
+        # w=1 without journal fsync keeps the hot insert path off the
+        # commit-latency critical path. State collections keep the
+        # default (stronger) write concern.
+        self._events_collection: Collection = self._db.get_collection(
+            EVENTS_COLLECTION, write_concern=WriteConcern(w=1, j=False))
         self._app_states_collection: Collection = self._db[APP_STATES_COLLECTION]
         self._user_states_collection: Collection = self._db[USER_STATES_COLLECTION]
 
-        self._sessions_collection.create_index([
-            ("_id", ASCENDING),
-            ("app_name", ASCENDING),
-            ("user_id", ASCENDING)
-        ]) 
-
-        self._sessions_collection.create_index([
-            ("app_name", ASCENDING),
-            ("user_id", ASCENDING)
-        ])
-
-
-        self._events_collection.create_index([
-            ("session_id", ASCENDING),
-            ("timestamp", ASCENDING)
-        ])
-        self._events_collection.create_index([
-             ("_id", ASCENDING),
-             ("app_name", ASCENDING),
-             ("user_id", ASCENDING),
-             ("session_id", ASCENDING)
-        ]) 
-
-        # Index for app states by _id (app_name)
-        self._app_states_collection.create_index([("_id", ASCENDING)]) 
-
-        # Index for user states by _id ({app_name, user_id})
-        self._user_states_collection.create_index([("_id", ASCENDING)])
+        index_key = f"{db_url}/{db_name}"
+        with _client_cache_lock:
+            needs_indexes = index_key not in _INDEXED_DBS
+            _INDEXED_DBS.add(index_key)
+
+        if needs_indexes:
+            # No index leading with _id: MongoDB already maintains the unique
+            # _id index, and since _id is unique the extra fields can never
+            # improve selectivity — they only cost a B-tree update per write.
+            self._sessions_collection.create_index([
+                ("app_name", ASCENDING),
+                ("user_id", ASCENDING)
+            ])
+
+            self._events_collection.create_index([
+                ("session_id", ASCENDING),
+                ("timestamp", ASCENDING)
+            ])
+            # Covers the full event query (session + owner + timestamp sort)
+            # so the server never needs an in-memory sort stage.
+            self._events_collection.create_index([
+                ("session_id", ASCENDING),
+                ("app_name", ASCENDING),
+                ("user_id", ASCENDING),
+                ("timestamp", ASCENDING)
+            ])
+            # The state collections are only ever addressed by _id, which is
+            # indexed implicitly.
+
+        # mode="json" keeps serialization on pydantic-core's Rust path and
+        # yields BSON-ready primitives in one pass.
+        self._dump = lambda m: m.model_dump(mode="json", exclude_none=True)
+
+        # In-process caches for the two state collections; PyMongo callers
+        # may be multithreaded, so guard with a lock.
+        self._state_cache_lock = threading.RLock()
+        self._app_state_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+        self._user_state_cache: Dict[tuple[str, str], tuple[float, Dict[str, Any]]] = {}
+
+    def _cached_app_state(self, app_name: str) -> Optional[Dict[str, Any]]:
+        with self._state_cache_lock:
+            entry = self._app_state_cache.get(app_name)
+        if entry and time.monotonic() - entry[0] < STATE_CACHE_TTL_SECONDS:
+            return entry[1]
+        return None
+
+    def _cached_user_state(self, app_name: str, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._state_cache_lock:
+            entry = self._user_state_cache.get((app_name, user_id))
+        if entry and time.monotonic() - entry[0] < STATE_CACHE_TTL_SECONDS:
+            return entry[1]
+        return None
+
+    def _store_app_state(self, app_name: str, state: Dict[str, Any]) -> None:
+        with self._state_cache_lock:
+            self._app_state_cache[app_name] = (time.monotonic(), state)
+
+    def _store_user_state(self, app_name: str, user_id: str, state: Dict[str, Any]) -> None:
+        with self._state_cache_lock:
+            self._user_state_cache[(app_name, user_id)] = (time.monotonic(), state)
+
+    def _invalidate_state_caches(self, app_name: str, user_id: str) -> None:
+        with self._state_cache_lock:
+            self._app_state_cache.pop(app_name, None)
+            self._user_state_cache.pop((app_name, user_id), None)
 
 
 
     def _extract_state_delta(self, state: Optional[Dict[str, Any]]) -> tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
         """Extracts app, user, and session state deltas from a combined state dictionary."""
-        app_state_delta = {}
-        user_state_delta = {}
-        session_state_delta = {}
+        app_state_delta: Dict[str, Any] = {}
+        user_state_delta: Dict[str, Any] = {}
+        session_state_delta: Dict[str, Any] = {}
         if state:
+            deltas = {
+                "app": app_state_delta,
+                "user": user_state_delta,
+            }
             for key, value in state.items():
-                if key.startswith(State.APP_PREFIX):
-                    app_state_delta[key.removeprefix(State.APP_PREFIX)] = value
-                elif key.startswith(State.USER_PREFIX):
-                    user_state_delta[key.removeprefix(State.USER_PREFIX)] = value
-                elif not key.startswith(State.TEMP_PREFIX):
+                hint = _PREFIX_TABLE.get(key[:1])
+                if hint is not None and key.startswith(hint[0]):
+                    prefix, kind = hint
+                    if kind == "temp":
+                        continue
+                    deltas[kind][key.removeprefix(prefix)] = value
+                else:
                     session_state_delta[key] = value
         return app_state_delta, user_state_delta, session_state_delta
 
     def _merge_state(self, app_state: Dict[str, Any], user_state: Dict[str, Any], session_state: Dict[str, Any]) -> Dict[str, Any]:
-        """Merges app, user, and session states into a single dictionary."""
-        # Deep copy session_state to avoid modifying the original dict fetched from DB
-        merged_state = copy.deepcopy(session_state)
-        for key, value in app_state.items():
-            merged_state[State.APP_PREFIX + key] = value
-        for key, value in user_state.items():
-            merged_state[State.USER_PREFIX + key] = value
-        return merged_state
+        """Merges app, user, and session states into a single dictionary.
+
+        The result is a fresh top-level dict, so callers can add or remove
+        keys freely; nested values are shared with the source dicts, which
+        downstream code only reads.
+        """
+        return {
+            **session_state,
+            **{State.APP_PREFIX + k: v for k, v in app_state.items()},
+            **{State.USER_PREFIX + k: v for k, v in user_state.items()},
+        }
+
+    def _state_update(self, delta: Dict[str, Any], current_time: float) -> Dict[str, Any]:
+        """Builds a keyed update document for a state delta.
+
+        Only the changed paths travel over the wire — O(|delta|) instead of
+        re-sending the whole state dict. None values mean key removal and
+        map to $unset so deleted keys do not linger as stored nulls.
+        """
+        update: Dict[str, Any] = {"$set": {"update_time": current_time}}
+        for k, v in delta.items():
+            if v is None:
+                update.setdefault("$unset", {})[f"state.{k}"] = ""
+            else:
+                update["$set"][f"state.{k}"] = v
+        return update
 
     def _encode_content(self, content: Dict[str, Any]) -> Dict[str, Any]:
         """Encodes event content for storage, handling binary data."""
-        if not content:
+        if not content or "parts" not in content:
             return content
-        # Deep copy to avoid modifying the original event object's content dict
-        encoded_content = copy.deepcopy(content)
-        if "parts" in encoded_content:
-            for p in encoded_content["parts"]:
-                if "inline_data" in p and "data" in p["inline_data"]:
-                    # Replicate the original's tuple format for binary data
-                    # Ensure data is bytes before encoding
-                    data_bytes = p["inline_data"]["data"]
-                    if isinstance(data_bytes, str): # If already decoded string, re-encode to bytes
-                         data_bytes = data_bytes.encode('utf-8') # Assuming utf-8 if string
-                    p["inline_data"]["data"] = (
-                        base64.b64encode(data_bytes).decode("utf-8"),
-                    )
-        return encoded_content
+        # Only parts carrying inline_data need rewriting; clone just those
+        # (and the parts list) instead of deep-copying the whole content,
+        # which for large text parts dominated the append path.
+        if not any(
+            "inline_data" in p and "data" in p["inline_data"]
+            for p in content["parts"]
+        ):
+            return content
+        new_parts = []
+        for p in content["parts"]:
+            if "inline_data" in p and "data" in p["inline_data"]:
+                # Replicate the original's tuple format for binary data
+                # Ensure data is bytes before encoding
+                data_bytes = p["inline_data"]["data"]
+                if isinstance(data_bytes, str): # If already decoded string, re-encode to bytes
+                    data_bytes = data_bytes.encode('utf-8') # Assuming utf-8 if string
+                p = {
+                    **p,
+                    "inline_data": {
+                        **p["inline_data"],
+                        "data": (
+                            base64.b64encode(data_bytes).decode("utf-8"),
+                        ),
+                    },
+                }
+            new_parts.append(p)
+        return {**content, "parts": new_parts}
 
     def _decode_content(self, content: Dict[str, Any]) -> Dict[str, Any]:
         """Decodes stored event content, handling binary data."""
-        if not content:
+        if not content or "parts" not in content:
+            return content
+        if not any(
+            "inline_data" in p
+            and isinstance(p["inline_data"].get("data"), tuple)
+            for p in content["parts"]
+        ):
             return content
-        decoded_content = copy.deepcopy(content)
-        if "parts" in decoded_content:
-            for p in decoded_content["parts"]:
-                if "inline_data" in p and "data" in p["inline_data"] and isinstance(p["inline_data"]["data"], tuple):
-                    # Expecting the tuple format from _encode_content
-                    try:
-                        p["inline_data"]["data"] = base64.b64decode(p["inline_data"]["data"][0])
-                    except (TypeError, IndexError, base64.binascii.Error) as e:
-                         logger.warning(f"Failed to base64 decode inline_data: {e}")
-                         # Depending on requirements, might raise error or leave as is
-                         pass # Leave potentially malformed data in place
-        return decoded_content
+        new_parts = []
+        for p in content["parts"]:
+            if "inline_data" in p and isinstance(p["inline_data"].get("data"), tuple):
+                # Expecting the tuple format from _encode_content
+                try:
+                    p = {
+                        **p,
+                        "inline_data": {
+                            **p["inline_data"],
+                            "data": base64.b64decode(
+                                p["inline_data"]["data"][0]),
+                        },
+                    }
+                except (TypeError, IndexError, base64.binascii.Error) as e:
+                    logger.warning(f"Failed to base64 decode inline_data: {e}")
+                    # Leave potentially malformed data in place
+            new_parts.append(p)
+        return {**content, "parts": new_parts}
+
+    def _apply_event_locally(self, session: Session, event: Event) -> None:
+        """Mirrors a committed event onto the in-memory Session object.
+
+        Replaces the BaseSessionService.append_event call after a DB
+        commit: the base implementation appends to session.events without
+        bound, so long-running agents grew O(events) in process memory
+        even though every event is already durable in Mongo. Apply the
+        state delta, append, and trim to the most recent window.
+        """
+        if event.actions and event.actions.state_delta:
+            for key, value in event.actions.state_delta.items():
+                if key.startswith(State.TEMP_PREFIX):
+                    continue
+                session.state[key] = value
+        session.events.append(event)
+        if len(session.events) > MAX_IN_MEMORY_EVENTS:
+            del session.events[:-MAX_IN_MEMORY_EVENTS]
 
     def _session_doc_to_obj(self, session_doc: Dict[str, Any], merged_state: Dict[str, Any], events: Optional[List[Event]] = None) -> Session:
          """Converts a MongoDB session document to a Session object."""
@@ -154,18 +314,45 @@ class MongoDBSessionService(BaseSessionService):
              user_id=session_doc["user_id"],
              id=session_doc["_id"], # Use _id as session ID
              state=merged_state,
-             last_update_time=session_doc["update_time"].timestamp(),
+             last_update_time=session_doc["update_time"],
          )
          if events is not None:
              session.events = events
          return session
 
+    def _event_to_doc(self, session: Session, event: Event) -> Dict[str, Any]:
+        """Converts an Event object to its MongoDB document form."""
+        return {
+            "_id": event.id, # MongoDB primary key
+            "invocation_id": event.invocation_id,
+            "author": event.author,
+            "branch": event.branch,
+            "actions": self._dump(event.actions) if event.actions else None,
+            "session_id": session.id,
+            "app_name": session.app_name,
+            "user_id": session.user_id,
+            "timestamp": float(event.timestamp),
+            "long_running_tool_ids": list(event.long_running_tool_ids) if event.long_running_tool_ids else [],
+            "grounding_metadata": event.grounding_metadata,
+            "partial": event.partial,
+            "turn_complete": event.turn_complete,
+            "error_code": event.error_code,
+            "error_message": event.error_message,
+            "interrupted": event.interrupted,
+            # Encode content before storing
+            "content": self._encode_content(event.content.model_dump(exclude_none=True) if event.content else {})
+        }
+
     def _event_doc_to_obj(self, event_doc: Dict[str, Any]) -> Event:
         """Converts a MongoDB event document to an Event object."""
         actions_data = event_doc.get("actions")
         actions_value_for_event_constructor = actions_data
 
-    
+        # Almost every event has no long-running tools; skip the per-event
+        # empty-set allocation and let pydantic keep the field's None
+        # default (Event declares Optional[set[str]] = None).
+        lrt = event_doc.get("long_running_tool_ids")
+
         return Event(
             id=event_doc["_id"], # Use _id as event ID
             author=event_doc["author"],
@@ -173,8 +360,8 @@ class MongoDBSessionService(BaseSessionService):
             invocation_id=event_doc["invocation_id"],
             content=self._decode_content(event_doc.get("content")) if event_doc.get("content") is not None else None,
             actions=actions_value_for_event_constructor,
-            timestamp=event_doc["timestamp"].timestamp(),
-            long_running_tool_ids=set(event_doc.get("long_running_tool_ids", [])),
+            timestamp=event_doc["timestamp"],
+            long_running_tool_ids=set(lrt) if lrt else None,
             grounding_metadata=event_doc.get("grounding_metadata"),
             partial=event_doc.get("partial"),
             turn_complete=event_doc.get("turn_complete"),
@@ -194,7 +381,7 @@ class MongoDBSessionService(BaseSessionService):
         session_id: Optional[str] = None,
     ) -> Session:
         session_id = session_id if session_id else str(uuid.uuid4())
-        current_time = datetime.now(timezone.utc)
+        current_time = time.time()
 
         app_state_delta, user_state_delta, session_state = self._extract_state_delta(state)
 
@@ -202,32 +389,36 @@ class MongoDBSessionService(BaseSessionService):
         with self._client.start_session() as mongo_session:
             mongo_session.start_transaction()
             try:
-                # Fetch existing states or prepare for upsert
-                app_state_doc = self._app_states_collection.find_one({"_id": app_name}, session=mongo_session)
-                user_state_doc = self._user_states_collection.find_one({"_id": {"app_name": app_name, "user_id": user_id}}, session=mongo_session)
-
-                app_state = app_state_doc["state"] if app_state_doc else {}
-                user_state = user_state_doc["state"] if user_state_doc else {}
-
-                # Apply state deltas
-                app_state.update(app_state_delta)
-                user_state.update(user_state_delta)
-
-                # Upsert app state (creates or updates)
-                self._app_states_collection.update_one(
-                   {"_id": app_name},
-                   {"$set": {"state": app_state, "update_time": current_time}},
-                   upsert=True,
-                   session=mongo_session
-               )
-
-                # Upsert user state (creates or updates)
-                self._user_states_collection.update_one(
-                   {"_id": {"app_name": app_name, "user_id": user_id}},
-                   {"$set": {"state": user_state, "update_time": current_time}},
-                   upsert=True,
-                   session=mongo_session
-               )
+                # Upsert the state deltas with keyed $set/$unset paths and
+                # read the merged document back in the same round trip,
+                # instead of the previous find_one + full-document rewrite
+                # per collection.
+                app_update = self._state_update(app_state_delta, current_time)
+                if not app_state_delta:
+                    app_update["$setOnInsert"] = {"state": {}}
+                app_state_doc = self._app_states_collection.find_one_and_update(
+                    {"_id": app_name},
+                    app_update,
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                    session=mongo_session
+                )
+
+                user_update = self._state_update(user_state_delta, current_time)
+                if not user_state_delta:
+                    user_update["$setOnInsert"] = {"state": {}}
+                user_state_doc = self._user_states_collection.find_one_and_update(
+                    {"_id": {"app_name": app_name, "user_id": user_id}},
+                    user_update,
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                    session=mongo_session
+                )
+
+                app_state = app_state_doc.get("state", {})
+                user_state = user_state_doc.get("state", {})
+                self._store_app_state(app_name, app_state)
+                self._store_user_state(app_name, user_id, user_state)
 
                 # Create session document using session_id as _id
                 session_doc = {
@@ -267,53 +458,88 @@ class MongoDBSessionService(BaseSessionService):
         session_id: str,
         config: Optional[GetSessionConfig] = None,
     ) -> Optional[Session]:
-        # Reads generally don't require transactions unless strong snapshot
-        # consistency across multiple documents is needed. Sequential reads here.
-
-        session_doc = self._sessions_collection.find_one(
-            {"_id": session_id, "app_name": app_name, "user_id": user_id}
-        )
-
-        if not session_doc:
-            return None
-
-        # Fetch states
-        app_state_doc = self._app_states_collection.find_one({"_id": app_name})
-        user_state_doc = self._user_states_collection.find_one({"_id": {"app_name": app_name, "user_id": user_id}})
-
-        app_state = app_state_doc["state"] if app_state_doc else {}
-        user_state = user_state_doc["state"] if user_state_doc else {}
-        session_state = session_doc.get("state", {})
-
-        # Merge states
-        merged_state = self._merge_state(app_state, user_state, session_state)
-
-        # Fetch events
-        event_query = {"session_id": session_id, "app_name": app_name, "user_id": user_id}
-        event_sort = [("timestamp", ASCENDING)] # Default to ascending chronological order
+        # Single aggregation instead of four serial reads (session, app
+        # state, user state, events): on a remote cluster the extra round
+        # trips dominate session fetch latency.
+        event_match: Dict[str, Any] = {
+            "$expr": {"$eq": ["$session_id", "$$sid"]},
+            "app_name": app_name,
+            "user_id": user_id,
+        }
+        event_sort = {"timestamp": 1} # Default to ascending chronological order
         event_limit = None
 
         if config:
             if config.after_timestamp is not None:
-                 # Convert timestamp float to datetime
-                 after_dt = datetime.fromtimestamp(config.after_timestamp)
-                 event_query["timestamp"] = {"$lt": after_dt}
+                 # Timestamps are stored as epoch floats, so this compares
+                 # directly against the config value.
+                 event_match["timestamp"] = {"$lt": config.after_timestamp}
 
             if config.num_recent_events is not None and config.num_recent_events > 0:
                 event_limit = config.num_recent_events
-                event_sort = [("timestamp", DESCENDING)]
-
+                event_sort = {"timestamp": -1}
 
-        cursor = self._events_collection.find(event_query).sort(event_sort)
+        events_pipeline: List[Dict[str, Any]] = [
+            {"$match": event_match},
+            {"$sort": event_sort},
+        ]
         if event_limit is not None:
-             cursor = cursor.limit(event_limit)
+            events_pipeline.append({"$limit": event_limit})
+
+        # Skip the state lookups entirely when fresh copies are cached
+        # in-process.
+        app_state = self._cached_app_state(app_name)
+        user_state = self._cached_user_state(app_name, user_id)
+
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"_id": session_id, "app_name": app_name, "user_id": user_id}},
+        ]
+        if app_state is None:
+            pipeline.append({"$lookup": {
+                "from": APP_STATES_COLLECTION,
+                "localField": "app_name",
+                "foreignField": "_id",
+                "as": "app_state_docs",
+            }})
+        if user_state is None:
+            pipeline.append({"$lookup": {
+                "from": USER_STATES_COLLECTION,
+                "pipeline": [
+                    {"$match": {"_id": {"app_name": app_name, "user_id": user_id}}}
+                ],
+                "as": "user_state_docs",
+            }})
+        pipeline.append({"$lookup": {
+            "from": EVENTS_COLLECTION,
+            "let": {"sid": "$_id"},
+            "pipeline": events_pipeline,
+            "as": "event_docs",
+        }})
+
+        result = list(self._sessions_collection.aggregate(pipeline))
+        if not result:
+            return None
+        session_doc = result[0]
+
+        event_docs = session_doc.pop("event_docs")
+
+        if app_state is None:
+            app_state_docs = session_doc.pop("app_state_docs")
+            app_state = app_state_docs[0]["state"] if app_state_docs else {}
+            self._store_app_state(app_name, app_state)
+        if user_state is None:
+            user_state_docs = session_doc.pop("user_state_docs")
+            user_state = user_state_docs[0]["state"] if user_state_docs else {}
+            self._store_user_state(app_name, user_id, user_state)
+        session_state = session_doc.get("state", {})
 
-        # Convert MongoDB event docs to Event objects
-        event_docs = list(cursor)
+        # Merge states
+        merged_state = self._merge_state(app_state, user_state, session_state)
 
-        # If sorted descending for limit, reverse to restore chronological order
-        if event_limit is not None and event_sort[0][1] == DESCENDING:
-             event_docs.reverse()
+        # If sorted descending for limit, iterate in reverse to restore
+        # chronological order — no second pass or extra list.
+        if event_limit is not None and event_sort["timestamp"] == -1:
+             event_docs = reversed(event_docs)
 
         events: List[Event] = [self._event_doc_to_obj(doc) for doc in event_docs]
 
@@ -328,18 +554,21 @@ class MongoDBSessionService(BaseSessionService):
         # Project to get only necessary fields efficiently
         projection = {"_id": 1, "update_time": 1, "app_name": 1, "user_id": 1} # Include keys for Session obj construction
 
-        cursor = self._sessions_collection.find(query, projection)
+        # Pull documents in large batches and build the result in a single
+        # comprehension instead of per-doc append calls.
+        cursor = self._sessions_collection.find(query, projection).batch_size(500)
 
-        sessions = []
-        for session_doc in cursor:
-            # Construct Session objects with minimal info (empty state as per original)
-            sessions.append(Session(
+        # Construct Session objects with minimal info (empty state as per original)
+        sessions = [
+            Session(
                 app_name=session_doc["app_name"],
                 user_id=session_doc["user_id"],
                 id=session_doc["_id"], # Use _id
                 state={},
-                last_update_time=session_doc["update_time"].timestamp(),
-            ))
+                last_update_time=session_doc["update_time"],
+            )
+            for session_doc in cursor
+        ]
 
         return ListSessionsResponse(sessions=sessions)
 
@@ -384,50 +613,92 @@ class MongoDBSessionService(BaseSessionService):
             logger.debug(f"Skipping storage for partial event {event.id}")
             return event
 
-        current_time = datetime.now(timezone.utc)
+        current_time = time.time()
+
+        app_state_delta, user_state_delta, session_state_delta = ({},{},{}) # Default empty
+
+        if event.actions and hasattr(event.actions, 'state_delta') and event.actions.state_delta:
+             app_state_delta, user_state_delta, session_state_delta = (
+                 self._extract_state_delta(event.actions.state_delta)
+             )
+
+        # Build the event document up front; both paths below insert it.
+        event_doc = self._event_to_doc(session, event)
+
+        if not (app_state_delta or user_state_delta or session_state_delta):
+            # Common case: the event carries no state change, so only the
+            # session's update_time and the event document are touched. A
+            # transaction (replica-set requirement, extra commit round trip)
+            # buys nothing here; fuse the stale check into a guarded update.
+            updated_doc = self._sessions_collection.find_one_and_update(
+                {
+                    "_id": session.id,
+                    "app_name": session.app_name,
+                    "user_id": session.user_id,
+                    "update_time": {"$lte": session.last_update_time},
+                },
+                {"$set": {"update_time": current_time}},
+            )
+            if updated_doc is None:
+                session_doc = self._sessions_collection.find_one(
+                    {"_id": session.id, "app_name": session.app_name, "user_id": session.user_id},
+                    {"update_time": 1},
+                )
+                if not session_doc:
+                    raise ValueError(f"Session {session.id} not found for appending event.")
+                db_update_timestamp = session_doc["update_time"]
+                raise ValueError(
+                    f"Session last_update_time {session.last_update_time} is stale."
+                    f" Current storage update_time: {db_update_timestamp}"
+                )
+
+            self._events_collection.insert_one(event_doc)
+
+            session.last_update_time = current_time
+            self._apply_event_locally(session, event)
+            return event
 
         # Start a transaction for atomicity of state updates and event insertion
         with self._client.start_session() as mongo_session:
             mongo_session.start_transaction()
             try:
-                session_doc = self._sessions_collection.find_one(
-                    {"_id": session.id, "app_name": session.app_name, "user_id": session.user_id},
+                # Fuse the stale check into the session update itself: the
+                # update_time precondition makes it a single CAS-style
+                # findAndModify instead of a read, Python compare and later
+                # write.
+                session_doc = self._sessions_collection.find_one_and_update(
+                    {
+                        "_id": session.id,
+                        "app_name": session.app_name,
+                        "user_id": session.user_id,
+                        "update_time": {"$lte": session.last_update_time},
+                    },
+                    self._state_update(session_state_delta, current_time),
                     session=mongo_session
                 )
 
-                if not session_doc:
-                    raise ValueError(f"Session {session.id} not found for appending event.")
-
-                db_update_timestamp = session_doc["update_time"].replace(tzinfo=timezone.utc).timestamp()
-                if db_update_timestamp > session.last_update_time:
+                if session_doc is None:
+                    check_doc = self._sessions_collection.find_one(
+                        {"_id": session.id, "app_name": session.app_name, "user_id": session.user_id},
+                        {"update_time": 1},
+                        session=mongo_session
+                    )
+                    if not check_doc:
+                        raise ValueError(f"Session {session.id} not found for appending event.")
+                    db_update_timestamp = check_doc["update_time"]
                     raise ValueError(
                         f"Session last_update_time {session.last_update_time} is stale."
                         f" Current storage update_time: {db_update_timestamp}"
                     )
 
-
-                app_state_doc = self._app_states_collection.find_one({"_id": session.app_name}, session=mongo_session)
-                user_state_doc = self._user_states_collection.find_one({"_id": {"app_name": session.app_name, "user_id": session.user_id}}, session=mongo_session)
-                app_state = app_state_doc["state"] if app_state_doc else {}
-                user_state = user_state_doc["state"] if user_state_doc else {}
-                session_state = session_doc.get("state", {})
-                app_state_delta, user_state_delta, session_state_delta = ({},{},{}) # Default empty
-
-
-                if event.actions and hasattr(event.actions, 'state_delta') and event.actions.state_delta:
-                     app_state_delta, user_state_delta, session_state_delta = (
-                         self._extract_state_delta(event.actions.state_delta)
-                     )
-                     app_state.update(app_state_delta)
-                     user_state.update(user_state_delta)
-                     session_state.update(session_state_delta)
-
+                # Write only the changed keys via dotted $set paths; no need
+                # to pre-read and rewrite the full state documents.
 
                 # 1. Update App State (using upsert=True for robustness, though should exist)
                 if app_state_delta: # Only update if there's a delta
                      self._app_states_collection.update_one(
                         {"_id": session.app_name},
-                        {"$set": {"state": app_state, "update_time": current_time}},
+                        self._state_update(app_state_delta, current_time),
                         upsert=True,
                         session=mongo_session
                      )
@@ -436,52 +707,22 @@ class MongoDBSessionService(BaseSessionService):
                 if user_state_delta: # Only update if there's a delta
                      self._user_states_collection.update_one(
                         {"_id": {"app_name": session.app_name, "user_id": session.user_id}},
-                        {"$set": {"state": user_state, "update_time": current_time}},
+                        self._state_update(user_state_delta, current_time),
                         upsert=True,
                         session=mongo_session
                      )
 
-                # 3. Update Session State and update_time
-                # Update session doc if there were session state changes or just to bump update_time
-                if session_state_delta or app_state_delta or user_state_delta:
-                     self._sessions_collection.update_one(
-                        {"_id": session.id},
-                        {"$set": {"state": session_state, "update_time": current_time}},
-                        session=mongo_session
-                     )
-
-
-                # 4. Insert Event document using event.id as _id
-                event_doc = {
-                    "_id": event.id, # MongoDB primary key
-                    "invocation_id": event.invocation_id,
-                    "author": event.author,
-                    "branch": event.branch,
-                    "actions": event.actions.model_dump(exclude_none=True) if event.actions else None,
-                    "session_id": session.id,
-                    "app_name": session.app_name,
-                    "user_id": session.user_id,
-                    "timestamp": datetime.fromtimestamp(event.timestamp),
-                    "long_running_tool_ids": list(event.long_running_tool_ids) if event.long_running_tool_ids else [],
-                    "grounding_metadata": event.grounding_metadata,
-                    "partial": event.partial,
-                    "turn_complete": event.turn_complete,
-                    "error_code": event.error_code,
-                    "error_message": event.error_message,
-                    "interrupted": event.interrupted,
-                    # Encode content before storing
-                    "content": self._encode_content(event.content.model_dump(exclude_none=True) if event.content else {})
-                }
-
+                # 3. Insert Event document using event.id as _id
                 self._events_collection.insert_one(event_doc, session=mongo_session)
 
                 mongo_session.commit_transaction()
                 logger.debug(f"Transaction committed for append_event {event.id}")
+                self._invalidate_state_caches(
+                    session.app_name, session.user_id)
 
-                session.last_update_time = current_time.timestamp()
+                session.last_update_time = current_time
 
-
-                super().append_event(session=session, event=event)
+                self._apply_event_locally(session, event)
                 return event
 
             except Exception as e:
@@ -490,6 +731,78 @@ class MongoDBSessionService(BaseSessionService):
                 raise
 
 
+    def append_events(self, session: Session, events: List[Event]) -> List[Event]:
+        """Appends several events to a session in one bulk write.
+
+        Amortizes the wire protocol and oplog sync across the batch instead
+        of paying one round trip (and possibly one transaction) per event.
+        State deltas from all events are merged in memory and written once.
+        """
+        stored_events = [
+            e for e in events if e.content is not None and not e.partial
+        ]
+        if not stored_events:
+            return events
+
+        current_time = time.time()
+
+        app_state_delta: Dict[str, Any] = {}
+        user_state_delta: Dict[str, Any] = {}
+        session_state_delta: Dict[str, Any] = {}
+        for e in stored_events:
+            if e.actions and hasattr(e.actions, 'state_delta') and e.actions.state_delta:
+                app_d, user_d, session_d = self._extract_state_delta(
+                    e.actions.state_delta)
+                app_state_delta.update(app_d)
+                user_state_delta.update(user_d)
+                session_state_delta.update(session_d)
+
+        ops = [InsertOne(self._event_to_doc(session, e)) for e in stored_events]
+
+        if not (app_state_delta or user_state_delta or session_state_delta):
+            self._sessions_collection.update_one(
+                {"_id": session.id, "app_name": session.app_name, "user_id": session.user_id},
+                {"$set": {"update_time": current_time}},
+            )
+            self._events_collection.bulk_write(ops, ordered=False)
+        else:
+            with self._client.start_session() as mongo_session:
+                mongo_session.start_transaction()
+                try:
+                    if app_state_delta:
+                        self._app_states_collection.update_one(
+                            {"_id": session.app_name},
+                            self._state_update(app_state_delta, current_time),
+                            upsert=True,
+                            session=mongo_session
+                        )
+                    if user_state_delta:
+                        self._user_states_collection.update_one(
+                            {"_id": {"app_name": session.app_name, "user_id": session.user_id}},
+                            self._state_update(user_state_delta, current_time),
+                            upsert=True,
+                            session=mongo_session
+                        )
+                    self._sessions_collection.update_one(
+                        {"_id": session.id},
+                        self._state_update(session_state_delta, current_time),
+                        session=mongo_session
+                    )
+                    self._events_collection.bulk_write(
+                        ops, ordered=False, session=mongo_session)
+                    mongo_session.commit_transaction()
+                    self._invalidate_state_caches(
+                        session.app_name, session.user_id)
+                except Exception as e:
+                    mongo_session.abort_transaction()
+                    logger.error(f"Transaction aborted during append_events for session {session.id}: {e}")
+                    raise
+
+        session.last_update_time = current_time
+        for e in stored_events:
+            self._apply_event_locally(session, e)
+        return events
+
     @override
     def list_events(
         self,
@@ -511,14 +824,17 @@ class MongoDBSessionService(BaseSessionService):
         return ListEventsResponse(events=events)
 
     def close(self):
-        """Closes the MongoDB connection."""
+        """Closes the MongoDB connection.
+
+        The client is shared across service instances for the same URL, so
+        this also evicts it from the module cache. No __del__ hook: a
+        garbage-collected instance must not tear down connections that
+        other instances are still using; atexit handles process shutdown.
+        """
         if hasattr(self, "_client") and self._client:
+            with _client_cache_lock:
+                for url, client in list(_CLIENT_CACHE.items()):
+                    if client is self._client:
+                        _CLIENT_CACHE.pop(url)
             self._client.close()
-            logger.info("MongoDB connection closed.")
-
-    def __del__(self):
-         # Ensure connection is closed when object is garbage collected
-         try:
-              self.close()
-         except Exception:
-              pass # Ignore errors during garbage collection
\ No newline at end of file
+            logger.info("MongoDB connection closed.")
\ No newline at end of file
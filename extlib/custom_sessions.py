@@ -1,17 +1,148 @@
 # custom_sessions.py
 # this file only uses the DatabaseSessionService class
 import logging
+import os
 
-from google.adk.sessions.database_session_service import DatabaseSessionService
+from sqlalchemy import Index, create_engine, event, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from google.adk.cli.cli_eval import EVAL_SESSION_ID_PREFIX
+from google.adk.sessions.base_session_service import ListSessionsResponse
+from google.adk.sessions.database_session_service import (
+    DatabaseSessionService,
+    DynamicJSON,
+    StorageEvent,
+    StorageSession,
+    _decode_content,
+)
 #from .custom_mongodb_session_service import MongoDBSessionService
 from google.adk.sessions.session import Session
 from google.adk.events.event import Event
+from typing import Optional
 from typing_extensions import override
 
 logger = logging.getLogger(__name__)
 
+# ADK's DynamicJSON TypeDecorator doesn't declare cache_ok, so every
+# statement using it is excluded from SQLAlchemy's compiled-SQL cache (and
+# logs a SAWarning). The type is stateless, so caching is safe to enable.
+DynamicJSON.cache_ok = True
+
+# Partial index backing the NOT LIKE 'eval%' filter in list_sessions, so the
+# listing query only ever scans non-eval rows. Declared once at module level
+# (Index objects attach themselves to the table metadata) and created lazily
+# in MyDatabaseSessionService.__init__.
+_NON_EVAL_SESSIONS_INDEX = Index(
+    "sess_nonev_idx",
+    StorageSession.app_name,
+    StorageSession.user_id,
+    sqlite_where=StorageSession.id.notlike(f"{EVAL_SESSION_ID_PREFIX}%"),
+    postgresql_where=StorageSession.id.notlike(f"{EVAL_SESSION_ID_PREFIX}%"),
+)
+
 class MyDatabaseSessionService(DatabaseSessionService):
 
+    def __init__(self, db_url: str):
+        super().__init__(db_url=db_url)
+        # The base class builds its engine with create_engine defaults (no
+        # tuned pool, no pre-ping). Rebuild it with an explicit QueuePool so
+        # concurrent requests reuse warm connections instead of paying
+        # connection setup per request.
+        tuned_engine = create_engine(
+            db_url,
+            pool_size=int(os.environ.get("SESSION_DB_POOL_SIZE", 20)),
+            max_overflow=int(os.environ.get("SESSION_DB_MAX_OVERFLOW", 10)),
+            pool_timeout=30,
+            pool_pre_ping=True,
+            query_cache_size=1200,
+            echo=False,
+        )
+        if db_url.startswith("sqlite"):
+            # Session-service calls run on threadpool threads, so sessions.db
+            # sees genuinely concurrent writers; same pragmas as the auth
+            # engine (extlib/auth/database.py), plus a busy_timeout so a
+            # write that does catch a lock waits instead of erroring.
+            @event.listens_for(tuned_engine, "connect")
+            def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                """Puts SQLite in WAL mode so readers don't block on writers."""
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute("PRAGMA busy_timeout=5000")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA mmap_size=268435456")
+                cursor.close()
+        self.db_engine.dispose()
+        self.db_engine = tuned_engine
+        self.inspector = inspect(tuned_engine)
+        self.DatabaseSessionFactory = sessionmaker(bind=tuned_engine)
+        _NON_EVAL_SESSIONS_INDEX.create(tuned_engine, checkfirst=True)
+
+    @override
+    def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        """Lists sessions without materializing full ORM rows.
+
+        The base implementation queries whole StorageSession entities, which
+        drags the JSON state column (and any touched relationships) across
+        the wire for every session even though the listing only needs ids
+        and update times. Select just those two columns instead: one query,
+        no per-row lazy loads. Eval sessions are excluded in the WHERE
+        clause (backed by the partial index above) rather than fetched and
+        discarded in Python.
+        """
+        with self.DatabaseSessionFactory() as sessionFactory:
+            rows = sessionFactory.execute(
+                select(StorageSession.id, StorageSession.update_time).where(
+                    StorageSession.app_name == app_name,
+                    StorageSession.user_id == user_id,
+                    StorageSession.id.notlike(f"{EVAL_SESSION_ID_PREFIX}%"),
+                )
+            ).all()
+            sessions = [
+                Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    state={},
+                    last_update_time=update_time.timestamp(),
+                )
+                for session_id, update_time in rows
+            ]
+            return ListSessionsResponse(sessions=sessions)
+
+    def get_event(
+        self, *, app_name: str, user_id: str, session_id: str, event_id: str
+    ) -> Optional[Event]:
+        """Fetches a single event by id without loading the whole session.
+
+        get_session pulls every event of the session just to find one;
+        this is a primary-key lookup returning exactly one row.
+        """
+        with self.DatabaseSessionFactory() as sessionFactory:
+            e = sessionFactory.get(
+                StorageEvent, (event_id, app_name, user_id, session_id)
+            )
+            if e is None:
+                return None
+            return Event(
+                id=e.id,
+                author=e.author,
+                branch=e.branch,
+                invocation_id=e.invocation_id,
+                content=_decode_content(e.content),
+                actions=e.actions,
+                timestamp=e.timestamp.timestamp(),
+                long_running_tool_ids=e.long_running_tool_ids,
+                grounding_metadata=e.grounding_metadata,
+                partial=e.partial,
+                turn_complete=e.turn_complete,
+                error_code=e.error_code,
+                error_message=e.error_message,
+                interrupted=e.interrupted,
+            )
+
     # Override the append_event method
     @override
     def append_event(self, session: Session, event: Event) -> Event:
@@ -1,5 +1,10 @@
 import os
 import re
+from urllib.parse import quote_plus
+
+# Compiled once at import time instead of going through re's pattern cache
+# on every call.
+_MONGO_URI_RE = re.compile(r"^mongodb(\+srv)?://[^:]+:[^@]+@[^/]+(/.+)?$")
 
 
 def get_mongodb_uri():
@@ -12,7 +17,7 @@ def get_mongodb_uri():
     mongo_uri_template = os.getenv('MONGO_DB_URI')
     username = os.getenv('MONGO_DB_USERNAME')
     password = os.getenv('MONGO_DB_PASSWORD')
-    
+
     # safety check for environment variables
     if not all([mongo_uri_template, username, password]):
         missing_vars = []
@@ -23,12 +28,15 @@ def get_mongodb_uri():
         if not password:
             missing_vars.append('MONGO_DB_PASSWORD')
         raise ValueError(f"mongo db missing vars : {', '.join(missing_vars)}")
-    
-    mongo_uri = mongo_uri_template.replace('<db_username>', username).replace('<db_password>', password)
-    
+
+    # quote_plus keeps credentials with reserved characters (@, :, /)
+    # from corrupting the URI
+    mongo_uri = mongo_uri_template.replace(
+        '<db_username>', quote_plus(username)).replace(
+        '<db_password>', quote_plus(password))
+
     # safety check for uri format
-    uri_pattern = r"^mongodb(\+srv)?://[^:]+:[^@]+@[^/]+(/.+)?$"
-    if not re.match(uri_pattern, mongo_uri):
+    if not _MONGO_URI_RE.match(mongo_uri):
         raise ValueError("MongoDB URI format is invalid. Please check the URI.")
-    
-    return mongo_uri
\ No newline at end of file
+
+    return mongo_uri
@@ -1,41 +1,93 @@
 from google.adk.agents import Agent, LlmAgent
 from google.adk.models.lite_llm import LiteLlm
+import importlib
 import os
+import re
 
-from income_tax_agent.ufile.ufile_t3 import get_t3_info, add_t3, remove_t3
-from income_tax_agent.ufile.ufile_t3_update import update_t3
-from income_tax_agent.ufile.ufile_t5 import get_t5_info, add_t5, remove_t5, update_t5
-from income_tax_agent.ufile.ufile_person import get_all_person_names, remove_person, add_spouse
-from income_tax_agent.ufile.ufile_t4 import add_t4, remove_t4, get_t4_info, update_t4_info
 from income_tax_agent.ufile.ufile_util import get_all_slips
 tools = [get_all_slips]
 
 # Load environment variables
 TOOLS_LIST = os.getenv("AGENT_TOOLS_LIST", "t3,t4,t5,person").split(",")
 
-t4_tools = [
-    add_t4, remove_t4, get_t4_info, update_t4_info
-]
+# Each tool group's module is imported only when the group is enabled, so
+# trimming AGENT_TOOLS_LIST also skips loading the disabled modules (and
+# everything they pull in) at startup.
 if "t4" in TOOLS_LIST:
-    tools.extend(t4_tools)
+    t4 = importlib.import_module("income_tax_agent.ufile.ufile_t4")
+    tools.extend([t4.add_t4, t4.remove_t4, t4.get_t4_info, t4.update_t4_info])
 
-t5_tools = [
-    get_t5_info, add_t5, remove_t5, update_t5
-]
 if "t5" in TOOLS_LIST:
-    tools.extend(t5_tools)
+    t5 = importlib.import_module("income_tax_agent.ufile.ufile_t5")
+    tools.extend([t5.get_t5_info, t5.add_t5, t5.remove_t5, t5.update_t5])
 
-t3_tools = [
-    get_t3_info, add_t3, remove_t3, update_t3
-]
 if "t3" in TOOLS_LIST:
-    tools.extend(t3_tools)
+    t3 = importlib.import_module("income_tax_agent.ufile.ufile_t3")
+    t3_update = importlib.import_module(
+        "income_tax_agent.ufile.ufile_t3_update")
+    tools.extend(
+        [t3.get_t3_info, t3.add_t3, t3.remove_t3, t3_update.update_t3])
 
-person_tools = [
-    get_all_person_names, remove_person, add_spouse
-]
 if "person" in TOOLS_LIST:
-    tools.extend(person_tools)
+    person = importlib.import_module("income_tax_agent.ufile.ufile_person")
+    tools.extend([person.get_all_person_names, person.remove_person,
+                  person.add_spouse])
+
+# Above this many enabled tools, only get_all_slips and search_tools are
+# sent to the model; the rest stay in the registry until discovered. Every
+# hidden tool saves its schema tokens on every turn.
+TOOL_THRESHOLD = int(os.getenv("AGENT_TOOL_THRESHOLD", "10"))
+SEARCH_TOP_K = 5
+
+_tool_registry = {t.__name__: t for t in tools}
+_active_tool_names: set[str] = set()
+
+
+def _keywords(text: str) -> set[str]:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def search_tools(query: str) -> str:
+    """
+    Find agent tools relevant to a task and make them available.
+
+    Use this when none of the currently available tools fits the request.
+    Matched tools become callable on the following turns.
+
+    Args:
+        query: Keywords describing the needed capability (e.g. "add t4 slip").
+
+    Returns:
+        The names and descriptions of the newly available tools.
+    """
+    query_words = _keywords(query)
+    scored = []
+    for name, func in _tool_registry.items():
+        score = len(query_words & _keywords(f"{name} {func.__doc__ or ''}"))
+        if score:
+            scored.append((-score, name, func))
+    scored.sort()
+
+    activated = []
+    for _, name, func in scored[:SEARCH_TOP_K]:
+        if name not in _active_tool_names:
+            # canonical_tools re-resolves self.tools each turn, so appending
+            # here exposes the tool from the next model call onward.
+            root_agent.tools.append(func)
+            _active_tool_names.add(name)
+        doc = (func.__doc__ or "").strip()
+        summary = doc.splitlines()[0] if doc else ""
+        activated.append(f"{name}: {summary}")
+
+    if not activated:
+        return ("No matching tools found. Available tools: "
+                + ", ".join(sorted(_tool_registry)))
+    return "These tools are now available:\n" + "\n".join(activated)
+
+
+if len(tools) > TOOL_THRESHOLD:
+    tools = [get_all_slips, search_tools]
+    _active_tool_names.update(t.__name__ for t in tools)
 
 root_agent = Agent(
     name="IncomeTaxAgent",
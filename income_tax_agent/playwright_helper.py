@@ -1,5 +1,11 @@
-from playwright.async_api import async_playwright
+from playwright.async_api import (
+    async_playwright,
+    TimeoutError as PlaywrightTimeoutError,
+    TargetClosedError,
+)
 from typing import Optional, Any
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 from dotenv import load_dotenv
 import os
@@ -9,14 +15,55 @@ logger = logging.getLogger(__name__)
 
 playwright_port = os.getenv("PLAYWRIGHT_PORT", 9300)
 
+# Size of the page pool used by acquire_page(). Pages (not contexts) are
+# pooled because separate contexts have separate cookie jars and would not
+# share the logged-in uFile session.
+POOL_SIZE = int(os.getenv("PLAYWRIGHT_POOL_SIZE", 4))
+# Recycle a pooled page after this many checkouts to shed accumulated
+# listeners and renderer memory.
+MAX_PAGE_USES = 50
+
 # Global variables to store browser instance and related objects
 _playwright: Optional[Any] = None
 _browser: Optional[Any] = None
 _context: Optional[Any] = None
 _page: Optional[Any] = None
 
+# Auto-accept confirm() dialogs. Installed via add_init_script so every
+# page gets it on creation instead of tools re-patching window.confirm
+# per call.
+_CONFIRM_OVERRIDE_JS = "window.confirm = () => true;"
+
+# Resource types aborted by the per-context route handler. Documents, xhr,
+# fetch and scripts stay untouched -- uFile's React UI needs them. Set
+# PLAYWRIGHT_BLOCK_ASSETS=0 to load pages fully (e.g. while logging in by
+# hand and visual rendering matters).
+_BLOCKED_RESOURCE_TYPES = {
+    "image", "stylesheet", "font", "media", "imageset", "beacon"}
+_BLOCK_ASSETS = os.getenv("PLAYWRIGHT_BLOCK_ASSETS", "1") != "0"
+
+
+async def _block_static_resources(route):
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Pool of checked-in pages; built lazily on the first acquire_page() call.
+# The build awaits _clone_page, so it is guarded by its own lock: without
+# one, two concurrent first calls would each build a pool seeded with the
+# same primary page and hand that tab to two callers at once.
+_page_pool: Optional[asyncio.Queue] = None
+_page_pool_lock = asyncio.Lock()
+_page_uses: dict[int, int] = {}
+
+# Single-flight guard for lazy attachment: concurrent first tool calls
+# must not each open their own CDP connection.
+_connect_lock = asyncio.Lock()
+
 
-async def run(url: str, browser_type: str = "chromium") -> bool:
+async def run(url: str, browser_type: str = "chromium",
+              ready_selector: Optional[str] = None) -> bool:
     """
     Start a browser instance and navigate to the specified URL.
     If browser is already running, it will navigate to the new URL.
@@ -24,63 +71,78 @@ async def run(url: str, browser_type: str = "chromium") -> bool:
     Args:
         url: The URL to navigate to
         browser_type: The type of browser to use ("chromium", "firefox", or "webkit")
+        ready_selector: Optional selector to wait for after navigation;
+            when omitted, the call returns at domcontentloaded
 
     Returns:
         bool: True if navigation was successful, False otherwise
     """
     global _playwright, _browser, _context, _page
 
-    # Validate browser type
-    if browser_type not in ["chromium", "firefox", "webkit"]:
+    # CDP attachment is chromium-only; brower_server.py owns the actual
+    # Chromium process, so the browser_type argument only exists for
+    # backwards compatibility.
+    if browser_type != "chromium":
         logger.warning(
-            f"Invalid browser type: {browser_type}. Using chromium instead.")
-        browser_type = "chromium"
+            f"Browser type {browser_type} is not supported over CDP. Using chromium instead.")
 
-    # If browser is not initialized, start a new instance
-    if _browser is None and _playwright is None:
-        logger.info(f"Initializing new {browser_type} browser instance")
-        _playwright = await async_playwright().start()
-        # Launch the specified browser
-        browser_launcher = getattr(_playwright, browser_type)
-        _browser = await browser_launcher.launch(headless=False)
-        _context = await _browser.new_context()
-        _page = await _context.new_page()
-    else:
-        logger.debug("Using existing browser instance")
-
-    try:
-        # Extra check before navigation to ensure page is still valid
-        if _page is None or not hasattr(_page, "goto"):
-            logger.warning("Page object is invalid, creating a new page")
-            # If context is still valid, try to create a new page
-            try:
-                _page = await _context.new_page()
-            except Exception:
-                # If context is not valid, rebuild everything
-                logger.warning("Context is invalid, restarting browser")
-                await _browser.close() if _browser else None
-                await _playwright.stop() if _playwright else None
-                _playwright = await async_playwright().start()
-                browser_launcher = getattr(_playwright, browser_type)
-                _browser = await browser_launcher.launch(headless=False)
-                _context = await _browser.new_context()
-                _page = await _context.new_page()
+    # Never launch a browser here: every worker attaches to the single
+    # Chromium owned by brower_server.py. Launching per process cost a
+    # multi-second cold start and ~200 MB RSS per duplicate instance.
+    if _browser is None or _playwright is None:
+        await connect_to_browser(f"http://localhost:{playwright_port}")
 
-        # Navigate to the URL (whether browser is new or existing) with a timeout
-        logger.info(f"Navigating to {url}")
-        await _page.goto(url, timeout=30000, wait_until="domcontentloaded")
-        # Wait for the page to be fully loaded
-        await _page.wait_for_load_state("networkidle")
-        logger.info(f"Successfully loaded {url}")
-        return True
-    except Exception as e:
-        logger.error(f"Error navigating to {url}: {str(e)}")
-        # If we get a thread-related error, clean up and restart on next run
-        if "thread" in str(e).lower() and "exited" in str(e).lower():
+    # Extra check before navigation to ensure page is still valid
+    if _page is None or not hasattr(_page, "goto"):
+        logger.warning("Page object is invalid, creating a new page")
+        # If context is still valid, try to create a new page
+        try:
+            _page = await _context.new_page()
+        except Exception:
+            # If context is not valid, drop our handles and reattach to
+            # the shared browser
+            logger.warning("Context is invalid, reconnecting to browser")
+            await stop()
+            await connect_to_browser(
+                f"http://localhost:{playwright_port}")
+
+    # A transient timeout retries on the existing connection with
+    # exponential back-off; only a closed browser/target drops the handles
+    # and reattaches. Tearing everything down on any exception meant every
+    # network hiccup paid a multi-second reconnect.
+    for attempt in range(3):
+        try:
+            logger.info(f"Navigating to {url}")
+            await _page.goto(url, timeout=30000,
+                             wait_until="domcontentloaded")
+            # No networkidle wait: uFile's SPA keeps long-poll/telemetry
+            # connections open, so networkidle never fires and the call sat
+            # out the full 30s timeout. Callers that need a specific element
+            # pass ready_selector instead.
+            if ready_selector:
+                await _page.wait_for_selector(ready_selector, timeout=30000)
+            logger.info(f"Successfully loaded {url}")
+            return True
+        except PlaywrightTimeoutError as e:
+            logger.warning(
+                f"Navigation to {url} timed out (attempt {attempt + 1}/3): {e}")
+            await asyncio.sleep(2 ** attempt)
+        except TargetClosedError as e:
             logger.warning(
-                "Browser thread has exited, will restart on next run")
-            await stop()  # This will clean up all resources
-        return False
+                f"Browser target closed while navigating to {url}: {e}")
+            await stop()
+            await connect_to_browser(f"http://localhost:{playwright_port}")
+        except Exception as e:
+            logger.error(f"Error navigating to {url}: {str(e)}")
+            # If we get a thread-related error, clean up and restart on next run
+            if "thread" in str(e).lower() and "exited" in str(e).lower():
+                logger.warning(
+                    "Browser thread has exited, will restart on next run")
+                await stop()  # This will clean up all resources
+            return False
+
+    logger.error(f"Navigation to {url} failed after 3 attempts")
+    return False
 
 
 async def get_page() -> Optional[Any]:
@@ -92,8 +154,21 @@ async def get_page() -> Optional[Any]:
     """
     global _page
     if _playwright is None:
-        logger.warning("Playwright will be initialized")
-        await connect_to_browser(f"http://localhost:{playwright_port}")
+        async with _connect_lock:
+            if _playwright is None:
+                logger.warning("Playwright will be initialized")
+                await connect_to_browser(
+                    f"http://localhost:{playwright_port}")
+
+    if _page is not None and _page.is_closed():
+        # Someone closed the cached tab (manually or via recycle failure);
+        # replace it rather than tearing the connection down.
+        logger.warning("Cached page was closed; opening a replacement")
+        try:
+            _page = await _context.new_page()
+        except Exception as e:
+            logger.error(f"Failed to replace closed page: {e}")
+            _page = None
 
     if _page is None:
         logger.error("Failed to initialize page")
@@ -101,6 +176,71 @@ async def get_page() -> Optional[Any]:
     return _page
 
 
+async def _clone_page(source: Any) -> Any:
+    """Opens a new page in the shared context at the source page's URL."""
+    page = await _context.new_page()
+    if source.url and not source.url.startswith("about:"):
+        await page.goto(source.url, timeout=30000,
+                        wait_until="domcontentloaded")
+    return page
+
+
+async def _maybe_recycle(page: Any) -> Any:
+    """Counts a checkout and replaces the page once it hits MAX_PAGE_USES."""
+    uses = _page_uses.get(id(page), 0) + 1
+    if uses < MAX_PAGE_USES or page is _page:
+        # The pool only holds clones, but never recycle the primary page
+        # should it ever land here; get_page() hands it out directly and
+        # closing it would strand those callers.
+        _page_uses[id(page)] = uses
+        return page
+    _page_uses.pop(id(page), None)
+    try:
+        fresh = await _clone_page(page)
+        await page.close()
+        return fresh
+    except Exception as e:
+        logger.warning(f"Failed to recycle pooled page: {e}")
+        return page
+
+
+@asynccontextmanager
+async def acquire_page():
+    """Checks a page out of the shared pool for the duration of one tool call.
+
+    A single module-global page serializes concurrent agent requests and
+    lets them stomp each other's navigation state. The pool holds POOL_SIZE
+    cloned tabs in the one logged-in context -- the primary get_page() tab
+    is deliberately excluded, since tools still using get_page() navigate
+    it at will. Callers get exclusive use of a tab and return it on exit.
+    Yields None when the browser is unavailable, mirroring get_page().
+    """
+    global _page_pool
+
+    page = await get_page()
+    if page is None:
+        yield None
+        return
+
+    if _page_pool is None:
+        async with _page_pool_lock:
+            if _page_pool is None:
+                # Clones only: the primary page is still handed out
+                # directly by get_page(), so putting it in the pool would
+                # let a non-pooled caller navigate a checked-out tab.
+                pool: asyncio.Queue = asyncio.Queue()
+                for _ in range(POOL_SIZE):
+                    pool.put_nowait(await _clone_page(page))
+                _page_pool = pool
+
+    page = await _page_pool.get()
+    try:
+        yield page
+    finally:
+        page = await _maybe_recycle(page)
+        _page_pool.put_nowait(page)
+
+
 async def connect_to_browser(instance_address: str) -> None:
     """
     Connect to an existing browser instance using the specified address.
@@ -130,6 +270,15 @@ async def connect_to_browser(instance_address: str) -> None:
                 "No contexts found. Creating a new context and page.")
             _context = await _browser.new_context()
             _page = await _context.new_page()
+        # Future pages pick the override up automatically; pages that
+        # already existed before we attached need it applied directly.
+        await _context.add_init_script(_CONFIRM_OVERRIDE_JS)
+        if _BLOCK_ASSETS:
+            # Skip bytes and render work the tools never look at; page
+            # loads gate nearly every T3/T4/T5 operation.
+            await _context.route("**/*", _block_static_resources)
+        for existing_page in _context.pages:
+            await existing_page.evaluate(_CONFIRM_OVERRIDE_JS)
     else:
         logger.debug("Already connected to a browser instance")
 
@@ -138,7 +287,7 @@ async def stop() -> None:
     """
     Close the browser instance if it's running.
     """
-    global _playwright, _browser, _context, _page
+    global _playwright, _browser, _context, _page, _page_pool
 
     if _browser is not None:
         logger.info("Closing browser")
@@ -153,6 +302,8 @@ async def stop() -> None:
     # Reset other globals
     _context = None
     _page = None
+    _page_pool = None
+    _page_uses.clear()
     logger.debug("Browser resources cleaned up")
 
 
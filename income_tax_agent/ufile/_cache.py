@@ -0,0 +1,70 @@
+"""Stale-while-revalidate cache for read-only browser tools.
+
+Slip and person reads re-scrape the uFile DOM on every call even though
+agents frequently repeat the same query within a turn or two. Entries are
+keyed by function name and arguments; a fresh hit returns instantly, a
+stale hit returns the old value while one background task refreshes it,
+and a miss awaits the real call.
+"""
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_cache: Dict[str, tuple[Any, float, Optional[asyncio.Task]]] = {}
+
+
+def invalidate(prefix: str) -> None:
+    """Drops every cached entry whose key starts with prefix.
+
+    Mutating tools call this with the read tool's function name so the
+    next read observes their change instead of a stale scrape.
+    """
+    for key in [k for k in _cache if k.startswith(prefix)]:
+        _cache.pop(key, None)
+
+
+def async_swr_cache(ttl: float = 30.0,
+                    cacheable: Callable[[Any], bool] = lambda value: True):
+    """Decorator caching an async tool's result with stale-while-revalidate.
+
+    Args:
+        ttl: Seconds a cached value counts as fresh.
+        cacheable: Predicate deciding whether a result may be stored;
+            used to keep transient error strings out of the cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = f"{func.__name__}:{args!r}:{sorted(kwargs.items())!r}"
+            now = time.monotonic()
+            entry = _cache.get(key)
+            if entry is not None:
+                value, stored_at, refresh = entry
+                if now - stored_at < ttl:
+                    return value
+                if refresh is None or refresh.done():
+                    async def _refresh():
+                        try:
+                            fresh = await func(*args, **kwargs)
+                            if cacheable(fresh):
+                                _cache[key] = (fresh, time.monotonic(), None)
+                            else:
+                                _cache.pop(key, None)
+                        except Exception as e:
+                            logger.warning(
+                                f"Background refresh of {key} failed: {e}")
+                            _cache.pop(key, None)
+                    _cache[key] = (value, stored_at,
+                                   asyncio.create_task(_refresh()))
+                return value
+
+            value = await func(*args, **kwargs)
+            if cacheable(value):
+                _cache[key] = (value, now, None)
+            return value
+        return wrapper
+    return decorator
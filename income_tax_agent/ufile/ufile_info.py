@@ -1,6 +1,26 @@
 from income_tax_agent import playwright_helper
-
-
+from income_tax_agent.ufile._cache import async_swr_cache
+
+# Walks every fieldset in-browser and returns all field data in a single
+# CDP round-trip. The previous per-fieldset locator loop issued 3-5
+# round-trips per fieldset (title, boxes, value), so a 50-fieldset slip
+# cost ~200 serialized protocol messages instead of 1.
+_SLIP_FIELDS_JS = """
+() => Array.from(document.querySelectorAll('fieldset')).map((fieldset) => {
+    const title = fieldset.querySelector('.int-label');
+    const input = fieldset.querySelector('input[type="text"]');
+    return {
+        title: title ? title.innerText.trim() : '',
+        box: Array.from(fieldset.querySelectorAll('.boxNumberContent'))
+            .map((box) => box.innerText.trim())
+            .filter(Boolean),
+        value: input ? input.value : '',
+    };
+})
+"""
+
+
+@async_swr_cache(ttl=30, cacheable=lambda v: isinstance(v, list))
 async def get_slip_info(name: str, include_null_values=False, include_title=False) -> list[dict]:
     """
     Select a specific slip by its name and extract all input fields information.
@@ -20,62 +40,49 @@ async def get_slip_info(name: str, include_null_values=False, include_title=Fals
                      - 'value': The current value in the input field (if any)
     """
 
-    page = await playwright_helper.get_page()
-    if page is None:
-        return "Ufile didn't load, please try again"
+    async with playwright_helper.acquire_page() as page:
+        if page is None:
+            return "Ufile didn't load, please try again"
+
+        slip_elements = page.locator('div.tocLabel').filter(has_text=name)
+        count = await slip_elements.count()
 
-    slip_elements = page.locator('div.tocLabel').filter(has_text=name)
-    count = await slip_elements.count()
+        if count == 0:
+            return f"Slip with name '{name}' not found."
 
-    if count == 0:
-        return f"Slip with name '{name}' not found."
+        await slip_elements.first.click()
 
-    await slip_elements.first.click()
+        # Wait for the slip form itself rather than sleeping a fixed
+        # second; some slips render no labelled fieldsets, in which case
+        # the timeout simply expires and evaluate returns an empty list.
+        try:
+            await page.locator('fieldset .int-label').first.wait_for(
+                state="visible", timeout=5000)
+        except Exception:
+            pass
 
-    # Give the page a moment to load the T5 content
-    await page.wait_for_timeout(1000)
-    # Find all fieldsets that contain input fields (similar to the test.html structure)
-    fieldsets = page.locator('fieldset')
-    count = await fieldsets.count()
+        # Extract every fieldset in one in-browser pass, then filter in Python.
+        raw_fields = await page.evaluate(_SLIP_FIELDS_JS)
 
     # Create a new list to store the formatted field data
     formatted_fields = []
 
-    # Process each fieldset individually
-    for i in range(count):
-        fieldset = fieldsets.nth(i)
-        item = {}
-
-        # Try to find the title/label
-        title_element = fieldset.locator('.int-label').first
-        title = await title_element.inner_text() if await title_element.count() > 0 else ""
-
-        boxs_element = fieldset.locator('.boxNumberContent')
-        boxs = await boxs_element.all()
-
-        box_list = []
-        if len(boxs) > 0:
-            for box_element in boxs:
-                box = await box_element.inner_text() if await box_element.count() > 0 else ""
-                if box:
-                    box_list.append(box.strip())
-
-        # Try to find the input value
-        input_element = fieldset.locator('input[type="text"]').first
-        value = await input_element.input_value() if await input_element.count() > 0 else ""
-
+    for raw in raw_fields:
         # Only add the field if we found a title
-        if title:
-            if include_title:
-                # If include_title is True, add the title to the item
-                item['title'] = title.strip()
-            item['box'] = box_list
-            item['value'] = value.strip() if value else None
-
-            # Add the item to the formatted_fields list based on include_null_values parameter
-            if include_null_values or item['value'] is not None:
-                # Only add items if include_null_values is True or the value is not None
-                formatted_fields.append(item)
+        if not raw['title']:
+            continue
+        item = {}
+        if include_title:
+            # If include_title is True, add the title to the item
+            item['title'] = raw['title']
+        item['box'] = raw['box']
+        value = raw['value'].strip()
+        item['value'] = value if value else None
+
+        # Add the item to the formatted_fields list based on include_null_values parameter
+        if include_null_values or item['value'] is not None:
+            # Only add items if include_null_values is True or the value is not None
+            formatted_fields.append(item)
 
     return formatted_fields
 
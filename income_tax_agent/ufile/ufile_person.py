@@ -1,5 +1,27 @@
 from income_tax_agent import playwright_helper
-
+from income_tax_agent.ufile import _cache
+from income_tax_agent.ufile._cache import async_swr_cache
+
+# Sets both name inputs and fires the framework's input/change listeners in
+# one round-trip, instead of two fill() calls that each pay a protocol
+# round-trip plus Playwright's actionability checks and simulated typing.
+_FILL_NAME_FIELDS_JS = """
+([firstName, lastName]) => {
+    const byLabel = (label) =>
+        document.querySelector('input[aria-label*="' + label + '"]');
+    for (const [label, value] of [['First name', firstName],
+                                  ['Last name', lastName]]) {
+        const el = byLabel(label);
+        if (!el) { throw new Error('Input not found: ' + label); }
+        el.value = value;
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+    }
+}
+"""
+
+
+@async_swr_cache(ttl=30, cacheable=lambda v: not v.startswith("Ufile didn't load"))
 async def get_all_person_names():
     """
     Get all family members in current session.
@@ -7,40 +29,29 @@ async def get_all_person_names():
     Returns:
         The title and name of the family head, spouse, and dependents.
     """
-    page = await playwright_helper.get_page()
-    if page is None:
-        return "Ufile didn't load, please try again"
-
-    family_numbers_list_elements = page.get_by_role("list", name="Family members")
-    list_items = family_numbers_list_elements.locator("li")
-    count = await list_items.count()
-
-    names = []
-
-    for i in range(count):
-        list_item = list_items.nth(i)
-        name_span  = list_item.locator("a > span").first
-        if await name_span.count() > 0:
-            name = (await name_span.inner_text()).strip()
-            names.append(name)
-    roles = []
-    if count < 3:
-        roles = names
-    else:
-        for idx, name in enumerate(names):
-            if idx == 0:
-                roles.append(f"Family Head: {name}")
-            elif idx == 1:
-                roles.append(f"Spouse: {name}")
-            else:
-                roles.append(f"Dependent: {name}")
-
+    async with playwright_helper.acquire_page() as page:
+        if page is None:
+            return "Ufile didn't load, please try again"
+
+        family_numbers_list_elements = page.get_by_role("list", name="Family members")
+        # One protocol call returns every member name; the old loop paid a
+        # count() probe plus an inner_text() read per list item.
+        names = [
+            n.strip()
+            for n in await family_numbers_list_elements.locator(
+                "li a > span").all_inner_texts()
+            if n.strip()
+        ]
+        count = len(names)
+    # Format from the names directly; the old code built "Role: name"
+    # strings only to split them back apart for the final message.
     if count < 3:
-        final_msg = "\n".join(roles)
-    else:
-        final_msg = f"Your Family Head is {roles[0].split(': ')[1]}, your Spouse is {roles[1].split(': ')[1]}, Your Dependents are listed below:\n" + "\n".join(f"- {n.split(': ')[1]}" for n in roles[2:])
-    
-    return final_msg
+        return "\n".join(names)
+    return (
+        f"Your Family Head is {names[0]}, your Spouse is {names[1]}, "
+        "Your Dependents are listed below:\n"
+        + "\n".join(f"- {n}" for n in names[2:])
+    )
 
 async def remove_person(name: str):
     """
@@ -53,52 +64,50 @@ async def remove_person(name: str):
         A message indicating whether the family member was removed successfully or not.
     """
 
-    page = await playwright_helper.get_page()
-    if page is None:
-        return "Ufile didn't load, please try again"
-
-    family_numbers_list_elements = page.get_by_role("list", name="Family members")
-    list_items = family_numbers_list_elements.locator("li")
-    count = await list_items.count()
-    if count == 0:
-        return "No family members found."
-    
-    for i in range(count):
-        list_item = list_items.nth(i)
-        name_span = list_item.locator('a > span').first
-        if await name_span.count() == 0:
-            continue
-        name_text = (await name_span.inner_text()).strip()
-
-        
-        if name_text == name:
-
-            member_btn = list_item.get_by_role("button")
-            await member_btn.click()
-            await page.wait_for_timeout(1500) # 切换成员网页加载速度特别慢，多给一点时间
-            remove_button = page.locator('#displayRemoveAppItem')
-            await page.evaluate("""
-            window.originalConfirm = window.confirm; // store the original confirm function, optional
-            window.confirm = function(message) {
-                console.log('Intercepted confirm: "' + message + '". Returning true.');
-                return true; // directly return true to simulate user confirmation
-            };
-            """)
-            await remove_button.click()
-            
-            family_numbers_list_elements = page.get_by_role("list", name="Family members")
-            new_list_items = family_numbers_list_elements.locator("li")
-            new_count = await new_list_items.count()
-
-            if new_count > 0:
-                first_item = new_list_items.nth(0)
-                first_button = first_item.get_by_role("button")
-                await first_button.click()
-
-            return f"Successfully removed family member: {name}"
-    
-
-   
+    async with playwright_helper.acquire_page() as page:
+        if page is None:
+            return "Ufile didn't load, please try again"
+
+        family_numbers_list_elements = page.get_by_role("list", name="Family members")
+        list_items = family_numbers_list_elements.locator("li")
+        items = await list_items.all()
+        if not items:
+            return "No family members found."
+
+        for list_item in items:
+            # all_inner_texts() returns [] for items without a name span,
+            # replacing the two-round-trip count() probe + inner_text()
+            # read with a single call.
+            texts = await list_item.locator('a > span').all_inner_texts()
+            if not texts:
+                continue
+            name_text = texts[0].strip()
+
+            if name_text == name:
+
+                member_btn = list_item.get_by_role("button")
+                await member_btn.click()
+                remove_button = page.locator('#displayRemoveAppItem')
+                # 切换成员网页加载速度特别慢，等按钮出现而不是固定睡眠
+                await remove_button.wait_for(state="visible", timeout=10000)
+                # window.confirm is overridden context-wide by
+                # playwright_helper's init script, so the dialog
+                # auto-accepts without a per-call patch.
+                await remove_button.click()
+
+                family_numbers_list_elements = page.get_by_role("list", name="Family members")
+                new_list_items = family_numbers_list_elements.locator("li")
+                new_count = await new_list_items.count()
+
+                if new_count > 0:
+                    first_item = new_list_items.nth(0)
+                    first_button = first_item.get_by_role("button")
+                    await first_button.click()
+
+                # The member list changed; drop cached person reads so
+                # the next call re-scrapes.
+                _cache.invalidate("get_all_person_names")
+                return f"Successfully removed family member: {name}"
 
     return f"Successfully removed family member: {name}"
 
@@ -115,27 +124,30 @@ async def add_spouse(first_name: str, last_name: str):
         A message indicating whether the spouse was added successfully or not.
     """
 
-    page = await playwright_helper.get_page()
-    if page is None:
-        return "Ufile didn't load, please try again"
-    if await page.locator('div.spouseHide').count() > 0:
-        return "Spouse already added."
-    
-    add_spouse_button = page.locator('#displayAddSpouse')
-    if await add_spouse_button.count() == 0:
-        return "Add spouse button not found."
-    await add_spouse_button.click()
-    await page.wait_for_timeout(5000)  
-
-    identification_section = page.locator('div.tocLabel').filter(has_text='Identification')
-    await identification_section.click()
-    await page.wait_for_timeout(1000)
-
-    await page.get_by_role("textbox", name="Enter Text. First name. You").fill(first_name)
-    await page.get_by_role("textbox", name="Enter Text. Last name. You").fill(last_name)
-    await page.wait_for_timeout(1000)
-    await page.get_by_role("button", name="Next Page. CRA questions").click()
-    await identification_section.click()
+    async with playwright_helper.acquire_page() as page:
+        if page is None:
+            return "Ufile didn't load, please try again"
+        if await page.locator('div.spouseHide').count() > 0:
+            return "Spouse already added."
+
+        add_spouse_button = page.locator('#displayAddSpouse')
+        if await add_spouse_button.count() == 0:
+            return "Add spouse button not found."
+        await add_spouse_button.click()
+
+        # Wait for the spouse's table of contents to appear instead of a
+        # fixed five-second sleep.
+        identification_section = page.locator('div.tocLabel').filter(has_text='Identification')
+        await identification_section.first.wait_for(state="visible", timeout=15000)
+        await identification_section.click()
+
+        first_name_box = page.get_by_role("textbox", name="Enter Text. First name. You")
+        await first_name_box.wait_for(state="visible", timeout=10000)
+        await page.evaluate(_FILL_NAME_FIELDS_JS, [first_name, last_name])
+        # The Next Page click stays in Playwright: it triggers framework
+        # routing, which the in-browser value writes do not.
+        await page.get_by_role("button", name="Next Page. CRA questions").click()
+        await identification_section.click()
     # fieldsets = page.locator('fieldset')
     # fieldset_count = await fieldsets.count()
 
@@ -148,6 +160,7 @@ async def add_spouse(first_name: str, last_name: str):
     #     input_element = id_element.locator('input[type="text"]').first
     
 
+    _cache.invalidate("get_all_person_names")
     return f"Successfully added spouse: {first_name} {last_name}"
 
 
@@ -1,7 +1,16 @@
 from income_tax_agent import playwright_helper
+from income_tax_agent.ufile import _cache
+from income_tax_agent.ufile._cache import async_swr_cache
 from income_tax_agent.ufile.ufile_info import get_slip_info, format_to_string
 
+# Selector strings shared by the T3 tools. Hoisted so each call reuses one
+# string instead of rebuilding it (the remove-button selector used to be
+# re-assembled as an f-string per invocation).
+TOC_LABEL_SEL = 'div.tocLabel'
+REMOVE_BTN_TMPL = 'button.tocIconRemove[aria-hidden="false"][aria-label*="{}"]'
 
+
+@async_swr_cache(ttl=30, cacheable=lambda v: isinstance(v, list))
 async def get_all_t3() -> list | str:
     """
     Get all T3 slips from the current member.
@@ -13,16 +22,10 @@ async def get_all_t3() -> list | str:
     if page is None:
         return "Ufile didn't load, please try again"
 
-    # Use a more specific selector that targets only the div elements containing "T3:" text
-    # This targets the exact elements containing T3 labels
-    t3_elements = page.locator('div.tocLabel').filter(has_text='T3:')
-    all_t3s = await t3_elements.all()
-
-    t3_values = []
-    for t3 in all_t3s:
-        t3_values.append(await t3.inner_text())
-
-    return t3_values
+    # all_inner_texts() batches the read server-side: one round-trip for
+    # every label, through the locator API instead of a raw evaluate.
+    return await page.locator(TOC_LABEL_SEL).filter(
+        has_text='T3:').all_inner_texts()
 
 
 async def get_t3_info(name: str) -> str | list[dict]:
@@ -63,12 +66,19 @@ async def add_t3(name: str) -> str:
         return "Ufile didn't load, please try again"
 
     await page.get_by_role("button", name="Interest, investment income").first.click()
-    await page.wait_for_timeout(1000)
-    await page.get_by_role("button", name="Add Item. T3 - Trust income").click()
-    await page.wait_for_timeout(1000)
-    await page.get_by_role("textbox", name="Enter Text. This T3 slip was issued by. ").fill(name)
-    await page.get_by_role("textbox", name="Enter Text. This T3 slip was issued by. ").press("Tab")
-
+    # Wait on the next element each step needs instead of fixed one-second
+    # sleeps; the flow proceeds as soon as the UI has rendered it.
+    add_item_button = page.get_by_role("button", name="Add Item. T3 - Trust income")
+    await add_item_button.wait_for(state="visible", timeout=5000)
+    await add_item_button.click()
+    issuer_box = page.get_by_role("textbox", name="Enter Text. This T3 slip was issued by. ")
+    await issuer_box.wait_for(state="visible", timeout=5000)
+    await issuer_box.fill(name)
+    await issuer_box.press("Tab")
+
+    # The TOC changed; cached listings and slip reads are stale.
+    _cache.invalidate("get_all_t3")
+    _cache.invalidate("get_slip_info")
     return f"New T3 slip '{name}' created successfully."
 
 
@@ -89,7 +99,7 @@ async def remove_t3(name: str) -> str:
         return "Ufile didn't load, please try again"
 
     # Find the T3 element with the given name
-    t3_elements = page.locator('div.tocLabel').filter(has_text=name)
+    t3_elements = page.locator(TOC_LABEL_SEL).filter(has_text=name)
     count = await t3_elements.count()
 
     if count == 0:
@@ -98,16 +108,13 @@ async def remove_t3(name: str) -> str:
     try:
 
         remove_button = page.locator(
-            f'button.tocIconRemove[aria-hidden="false"][aria-label*="{name}"]').first
-        await page.evaluate("""
-            window.originalConfirm = window.confirm; // store the original confirm function, optional
-            window.confirm = function(message) {
-                console.log('Intercepted confirm: "' + message + '". Returning true.');
-                return true; // directly return true to simulate user confirmation
-            };
-        """)
-
+            REMOVE_BTN_TMPL.format(name)).first
+        # window.confirm is overridden context-wide by playwright_helper's
+        # init script, which also closes the race of a confirm firing
+        # before a per-call patch could run.
         await remove_button.click()
+        _cache.invalidate("get_all_t3")
+        _cache.invalidate("get_slip_info")
         return f"Successfully removed T3 slip: {name}"
     except Exception as e:
         return f"Error updating T3 slip: {str(e)}"
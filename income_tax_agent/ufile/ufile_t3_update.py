@@ -1,6 +1,22 @@
 from typing import Optional
 from income_tax_agent import playwright_helper
-from income_tax_agent.ufile.ufile_t3 import get_t3_info
+from income_tax_agent.ufile import _cache
+from income_tax_agent.ufile.ufile_t3 import TOC_LABEL_SEL, get_t3_info
+
+# Reads every fieldset's title and box number in one protocol round-trip;
+# the index points back at the matching fieldset so only the final fill
+# touches a locator. The old loop paid up to six round-trips per fieldset.
+_T3_FIELDS_JS = """
+() => Array.from(document.querySelectorAll('fieldset')).map((fieldset, index) => {
+    const title = fieldset.querySelector('.int-label');
+    const box = fieldset.querySelector('.boxNumberContent');
+    return {
+        index,
+        title: title ? title.innerText.trim() : '',
+        box: box ? box.innerText.trim() : '',
+    };
+})
+"""
 
 
 async def update_t3(name: str, value: str, title: Optional[str] = None, box: Optional[str] = None) -> str:
@@ -24,44 +40,41 @@ async def update_t3(name: str, value: str, title: Optional[str] = None, box: Opt
     if not title and not box:
         return "Either title or box must be provided to update the T3 slip."
 
-    t3_elements = page.locator('div.tocLabel').filter(has_text='T3:')
+    t3_elements = page.locator(TOC_LABEL_SEL).filter(has_text='T3:')
     counts = await t3_elements.count()
 
     if counts == 0:
         return f"T3 slip with name '{name}' not found."
 
     await t3_elements.filter(has_text=name).first.click()
-    await page.wait_for_timeout(500)  # Give more time for the UI to update
+    # Wait for the slip form itself rather than a fixed delay; a slip with
+    # no labelled fieldsets just lets the timeout expire.
+    try:
+        await page.locator('fieldset .int-label').first.wait_for(
+            state="visible", timeout=5000)
+    except Exception:
+        pass
 
-    fieldsets = page.locator('fieldset')
-    fieldset_count = await fieldsets.count()
+    fields = await page.evaluate(_T3_FIELDS_JS)
 
-    if fieldset_count == 0:
+    if not fields:
         return "No fieldsets found in the T3 slip."
 
-    for i in range(fieldset_count):
-        fieldset = fieldsets.nth(i)
-
-        # Try to find the title/label
-        title_element = fieldset.locator('.int-label').first
-        title_text = await title_element.inner_text() if await title_element.count() > 0 else ""
-
-        # Try to find the box number
-        box_element = fieldset.locator('.boxNumberContent').first
-        box_text = await box_element.inner_text() if await box_element.count() > 0 else ""
-
-        # Try to find the input value
-        input_element = fieldset.locator('input[type="text"]').first
-
+    for field in fields:
         # Check if this is the correct fieldset based on title and box number
-        match_title = title is None or title_text == title
-        match_box = box is None or box in box_text
+        match_title = title is None or field['title'] == title
+        match_box = box is None or box in field['box']
 
         if match_title and match_box:
+            input_element = page.locator('fieldset').nth(
+                field['index']).locator('input[type="text"]').first
             if await input_element.count() > 0:
                 await input_element.fill(value)
                 # type tab to move focus away
                 await input_element.press("Tab")
+                # Slip data changed; drop cached reads so a verify-after-
+                # write sees the new value instead of a stale 30s entry.
+                _cache.invalidate("get_slip_info")
                 return f"Successfully updated T3 slip: {name} - {title} (Box {box}): {value}"
 
     all_info = await get_t3_info(name)
@@ -1,5 +1,6 @@
 from typing import Optional
 from income_tax_agent import playwright_helper
+from income_tax_agent.ufile import _cache
 from income_tax_agent.ufile.ufile_info import get_slip_info, format_to_string
 
 
@@ -50,6 +51,9 @@ async def add_t5(name: str) -> str:
     await page.get_by_role("textbox", name="Enter Text. This T5 slip was").fill(name)
     await page.get_by_role("textbox", name="Enter Text. This T5 slip was").press("Tab")
 
+    # The TOC changed; cached slip reads are stale. get_all_t5 itself is
+    # uncached, so only get_slip_info needs dropping.
+    _cache.invalidate("get_slip_info")
     return f"Successfully added T5 slip: {name}"
 
 
@@ -117,6 +121,9 @@ async def update_t5(name: str, value: str, title: Optional[str] = None, box: Opt
                     await input_element.fill(value)
                     # type tab to move focus away
                     await input_element.press("Tab")
+                    # Drop cached reads so a verify-after-write sees the
+                    # new value instead of a stale 30s entry.
+                    _cache.invalidate("get_slip_info")
                     return f"Successfully updated T5 slip: {name} - {title} (Box {box}): {value}"
                 else:
                     return f"Input element not found for T5 slip: {name} - {title} (Box{box})"
@@ -168,6 +175,7 @@ async def remove_t5(name: str) -> str:
         #         f'button.tocIconRemove[aria-label*="{name}"]')
         # Click the remove button
         await remove_button.click()
+        _cache.invalidate("get_slip_info")
         return f"Successfully removed T5 slip: {name}"
     except Exception as e:
         return f"Error updating T5 slip: {str(e)}"
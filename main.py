@@ -1,6 +1,13 @@
 import os
 
 import uvicorn
+try:
+    # libuv-based event loop: noticeably faster socket I/O for the SSE and
+    # websocket paths. Optional; stdlib asyncio is used where unavailable.
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager # Import for lifespan
@@ -55,4 +62,10 @@ async def root():
 
 if __name__ == "__main__":
     # Use the PORT environment variable provided by Cloud Run, defaulting to 8080
-    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 8080)),
+        loop="uvloop" if uvloop else "auto",
+        http="httptools",  # C-level HTTP parsing
+    )
@@ -0,0 +1,52 @@
+"""One-off migration: convert BSON datetime fields to epoch floats.
+
+MongoDBSessionService now stores event ``timestamp`` and session/state
+``create_time``/``update_time`` as epoch doubles, so reads no longer pay a
+datetime construction and ``.timestamp()`` call per document. Run once after
+deploying:
+
+    python migrate_mongo_timestamps.py
+
+Safe to re-run; documents already holding doubles are skipped by the
+``$type: "date"`` filters.
+"""
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from extlib.helpers import get_mongodb_uri
+
+load_dotenv()
+
+DB_NAME = "taxagent_session_service"
+
+# (collection, fields stored as datetimes before the epoch-double change)
+TARGETS = [
+    ("sessions", ["create_time", "update_time"]),
+    ("events", ["timestamp"]),
+    ("app_states", ["update_time"]),
+    ("user_states", ["update_time"]),
+]
+
+
+def main():
+    client = MongoClient(get_mongodb_uri())
+    db = client[DB_NAME]
+    try:
+        for collection_name, fields in TARGETS:
+            collection = db[collection_name]
+            migrated = 0
+            for field in fields:
+                # $toDouble on a date yields milliseconds since the epoch;
+                # divide to match time.time()'s seconds.
+                result = collection.update_many(
+                    {field: {"$type": "date"}},
+                    [{"$set": {field: {"$divide": [{"$toDouble": f"${field}"}, 1000.0]}}}],
+                )
+                migrated += result.modified_count
+            print(f"{collection_name}: migrated {migrated} datetime fields.")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""One-off migration: convert users.id from 36-char UUID strings to 16 raw bytes.
+
+Run once after deploying the BINARY(16) primary key change:
+
+    python migrate_user_ids.py
+
+Safe to re-run; rows already stored as 16-byte blobs are skipped.
+"""
+import asyncio
+import uuid
+
+from sqlalchemy import text
+
+from extlib.auth.database import engine
+
+
+async def main():
+    async with engine.begin() as conn:
+        rows = (await conn.execute(text("SELECT id FROM users"))).fetchall()
+        migrated = 0
+        for (old_id,) in rows:
+            if isinstance(old_id, bytes) and len(old_id) == 16:
+                continue  # already migrated
+            new_id = uuid.UUID(old_id if isinstance(old_id, str) else old_id.decode()).bytes
+            await conn.execute(
+                text("UPDATE users SET id = :new_id WHERE id = :old_id"),
+                {"new_id": new_id, "old_id": old_id},
+            )
+            migrated += 1
+    print(f"Migrated {migrated} of {len(rows)} user ids to 16-byte form.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())